@@ -0,0 +1,26 @@
+"""Normalization of artist names typed by players."""
+import re
+import unicodedata
+
+# "feat." / "ft." / "featuring" and "&" / "+" / "and" are collapsed to one token each
+_FEATURING = re.compile(r"\b(?:featuring|feat|ft)\b")
+_AND = re.compile(r"\s*[&+]\s*|\band\b")
+# Anything but a letter or digit, in any script
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_artist_name(name):
+    """Return the lookup key for an artist name.
+
+    The key is casefolded, has accents stripped and ignores punctuation and
+    spacing, so "Jay-Z", "JAY-Z" and "jay z" all share the key "jayz".
+    Letters and digits of every script are kept ("Моргенштерн" keys as
+    "моргенштерн"), and a name with none at all, like "!!!", keys as its
+    casefolded self without whitespace rather than as "".
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    name = folded.replace("$", "s")
+    name = _FEATURING.sub(" feat ", name)
+    name = _AND.sub(" and ", name)
+    return _NON_WORD.sub("", name) or "".join(folded.split())
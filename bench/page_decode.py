@@ -0,0 +1,181 @@
+"""Micro-benchmark of song page decoding: response.json() against genius_api.decode_songs_page.
+
+    python -m bench.page_decode --pages 40 --repeats 20
+
+Pages carry the full song metadata the real API returns, not just the
+fields the stub server fills in. response_json keeps each parsed page as
+is; response_json_songs then builds the same Song tuples decode_songs_page
+returns. For each decoder the report gives pages decoded per second in the
+fastest pass, the bytes allocated at peak while decoding one page, and the
+bytes allocated at peak and still held once a whole discography's pages
+have been decoded and kept, as a crawl keeps them. speed_ratio is
+decode_songs_page's pages per second over each of the others'.
+"""
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import requests
+
+import genius_api
+
+
+def genius_artist(artist_id, rng):
+    image = f"https://images.genius.com/{artist_id:032x}.1000x1000x1.jpg"
+    return {
+        "api_path": f"/artists/{artist_id}",
+        "header_image_url": image,
+        "id": artist_id,
+        "image_url": image,
+        "iq": rng.randint(0, 100000),
+        "is_meme_verified": False,
+        "is_verified": rng.random() < 0.3,
+        "name": f"Artist {artist_id}",
+        "url": f"https://genius.com/artists/Artist-{artist_id}",
+    }
+
+
+def genius_song(song_id, artist_count, rng):
+    """One song as the real /artists/{id}/songs endpoint lists it."""
+    primary = genius_artist(rng.randint(1, artist_count), rng)
+    featured = [genius_artist(rng.randint(1, artist_count), rng) for _ in range(rng.choice((0, 0, 1, 1, 2, 3)))]
+    art = f"https://images.genius.com/{song_id:032x}"
+    return {
+        "annotation_count": rng.randint(0, 40),
+        "api_path": f"/songs/{song_id}",
+        "artist_names": " & ".join(artist["name"] for artist in [primary] + featured),
+        "featured_artists": featured,
+        "full_title": f"Song {song_id} by {primary['name']}",
+        "header_image_thumbnail_url": f"{art}.300x300x1.jpg",
+        "header_image_url": f"{art}.1000x1000x1.jpg",
+        "id": song_id,
+        "lyrics_owner_id": rng.randint(1, 10 ** 7),
+        "lyrics_state": "complete",
+        "path": f"/Artist-{primary['id']}-song-{song_id}-lyrics",
+        "primary_artist": primary,
+        "primary_artist_names": primary["name"],
+        "primary_artists": [primary],
+        "pyongs_count": rng.randint(0, 200),
+        "relationships_index_url": f"https://genius.com/Song-{song_id}-sample",
+        "release_date_components": {"year": rng.randint(1990, 2026), "month": rng.randint(1, 12), "day": rng.randint(1, 28)},
+        "release_date_for_display": "May 3, 2019",
+        "release_date_with_abbreviated_month_for_display": "May. 3, 2019",
+        "song_art_image_thumbnail_url": f"{art}.300x300x1.jpg",
+        "song_art_image_url": f"{art}.1000x1000x1.jpg",
+        "stats": {"unreviewed_annotations": 0, "hot": False, "pageviews": rng.randint(0, 10 ** 7)},
+        "title": f"Song {song_id}",
+        "title_with_featured": f"Song {song_id}",
+        "url": f"https://genius.com/Artist-{primary['id']}-song-{song_id}-lyrics",
+    }
+
+
+def make_pages(pages, per_page, artist_count, seed):
+    """Encoded response bodies for a discography of pages * per_page songs."""
+    rng = random.Random(seed)
+    bodies = []
+    for page in range(1, pages + 1):
+        songs = [genius_song((page - 1) * per_page + i + 1, artist_count, rng) for i in range(per_page)]
+        body = {"meta": {"status": 200}, "response": {"songs": songs, "next_page": page + 1 if page < pages else None}}
+        bodies.append(json.dumps(body).encode("utf-8"))
+    return bodies
+
+
+def as_response(content):
+    """A requests.Response holding content, as the session returns it after decompression."""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json; charset=utf-8"
+    response._content = content
+    return response
+
+
+def decode_json(content):
+    """The old path: keep each page's parsed "response" object."""
+    data = as_response(content).json()
+    return data["response"]["songs"], data["response"]["next_page"]
+
+
+def decode_json_songs(content):
+    """response.json(), then the same Song tuples decode_songs_page returns."""
+    data = as_response(content).json()
+    songs = [
+        genius_api.Song(entry["id"], tuple({
+            artist["id"]: artist["name"] for artist in [entry["primary_artist"], *(entry["featured_artists"] or ())]
+        }.items()))
+        for entry in data["response"]["songs"]
+    ]
+    return songs, data["response"]["next_page"]
+
+
+def decode_lean(content):
+    return genius_api.decode_songs_page(as_response(content).content)
+
+
+DECODERS = {"response_json": decode_json, "response_json_songs": decode_json_songs, "decode_songs_page": decode_lean}
+
+
+def pages_per_second(decoders, bodies, repeats):
+    """Pages/sec of each decoder's fastest of repeats passes.
+
+    Passes alternate between decoders, so a busy or throttled CPU slows
+    them alike.
+    """
+    seconds = dict.fromkeys(decoders, float("inf"))
+    for _ in range(repeats):
+        for name, decode in decoders.items():
+            start = time.perf_counter()
+            kept = [decode(body) for body in bodies]
+            seconds[name] = min(seconds[name], time.perf_counter() - start)
+            del kept
+    return {name: len(bodies) / seconds[name] for name in decoders}
+
+
+def measure_memory(decode, bodies):
+    """Peak bytes decoding one page, then peak and retained bytes decoding and keeping every page."""
+    tracemalloc.start()
+    decode(bodies[0])
+    _, page_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    kept = [decode(body) for body in bodies]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    songs = sum(len(page_songs) for page_songs, _ in kept)
+    return {
+        "page_peak_bytes": page_peak,
+        "peak_bytes": peak,
+        "retained_bytes": retained,
+        "retained_bytes_per_song": retained / songs if songs else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare song page decoders on synthetic full-metadata pages.")
+    parser.add_argument("--pages", type=int, default=40, help="pages in the decoded discography")
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--artists", type=int, default=5000, help="distinct artists credited across the pages")
+    parser.add_argument("--repeats", type=int, default=20, help="timed passes over every page")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    bodies = make_pages(args.pages, args.per_page, args.artists, args.seed)
+    body_bytes = sum(len(body) for body in bodies)
+    report = {
+        "pages": args.pages,
+        "per_page": args.per_page,
+        "body_bytes_per_page": body_bytes / args.pages,
+        "gzip_bytes_per_page": sum(len(gzip.compress(body, compresslevel=6)) for body in bodies) / args.pages,
+    }
+    speeds = pages_per_second(DECODERS, bodies, args.repeats)
+    for name, decode in DECODERS.items():
+        report[name] = {"pages_per_second": speeds[name], **measure_memory(decode, bodies)}
+    report["speed_ratio"] = {name: speeds["decode_songs_page"] / speeds[name] for name in ("response_json", "response_json_songs")}
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""Reproducible benchmark of the game's lookup path against a local stub Genius server.
+
+    python -m bench.run_bench --turns 200 --latency 40 --out bench.json
+    python -m bench.run_bench --compare bench.json     # exit 1 on a regression
+
+Turns are checked by the headless GameEngine inside a throwaway working
+directory, so the real collaborations.db and image cache are never touched.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from bench.stub_genius import StubGenius, load_fixture, make_fixture, save_fixture
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Metrics compared by --compare, and whether a bigger number is better
+METRICS = {
+    "cold.p50_ms": False,
+    "cold.p95_ms": False,
+    "warm.p50_ms": False,
+    "warm.p95_ms": False,
+    "pages.pages_per_second": True,
+    "db.rows_per_second": True,
+    "memory.peak_traced_mb": False,
+    "startup.first_paint_ms": False,
+    "startup.process_ms": False,
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies):
+    return {
+        "turns": len(latencies),
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+    }
+
+
+def plan_turns(fixture, turns, invalid_rate, seed):
+    """Build a deterministic list of (answer name, current artist ID) moves through the fixture graph."""
+    rng = random.Random(seed)
+    artists = fixture["artists"]
+    neighbors = {artist_id: set() for artist_id in artists}
+    for song in fixture["songs"]:
+        credited = [song["primary_artist"]["id"]] + [a["id"] for a in song["featured_artists"]]
+        for a in credited:
+            neighbors[a].update(b for b in credited if b != a)
+    connected = [artist_id for artist_id, others in neighbors.items() if others]
+
+    moves = []
+    current = None
+    while len(moves) < turns:
+        if current is None:
+            current = rng.choice(connected)
+            moves.append((artists[current], None))
+            continue
+        if rng.random() < invalid_rate:
+            answer = rng.choice([a for a in rng.sample(list(artists), 20) if a not in neighbors[current]] or [current])
+            moves.append((artists[answer], current))
+            current = None
+        else:
+            answer = rng.choice(sorted(neighbors[current]))
+            moves.append((artists[answer], current))
+            current = answer
+    return moves
+
+
+def run_turns(engine_factory, moves, lookup_error):
+    """Play the moves through a fresh engine and return per-turn latencies in ms and outcome counts.
+
+    A turn the engine couldn't judge because the stub failed it counts as an "error" outcome.
+    """
+    engine = engine_factory()
+    latencies = []
+    outcomes = {}
+    try:
+        for answer, current in moves:
+            start = time.perf_counter()
+            try:
+                status = engine.check_turn(answer, current)["status"]
+            except lookup_error:
+                status = "error"
+            latencies.append((time.perf_counter() - start) * 1000)
+            outcomes[status] = outcomes.get(status, 0) + 1
+    finally:
+        # Crawls that outlived an early answer must be cached before the warm pass
+        engine.wait_for_crawls()
+        engine.close()
+    return latencies, outcomes
+
+
+def bench_pages(genius_api, stub, fixture, repeats):
+    """Time full discography fetches of the most prolific artist."""
+    artist_id = max(stub.discographies, key=lambda a: len(stub.discographies[a]))
+    pages = 0
+    seconds = 0.0
+    for _ in range(repeats):
+        _, stats = genius_api.fetch_artist_songs(artist_id, "bench")
+        pages += stats.pages
+        seconds += stats.seconds
+    return {
+        "artist_songs": len(stub.discographies[artist_id]),
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_second": pages / seconds if seconds else 0.0,
+    }
+
+
+def bench_db(CollaborationDB, path, artists, songs_per_artist):
+    """Measure collaboration rows written per second through save_songs."""
+    db = CollaborationDB(path)
+    try:
+        start = time.perf_counter()
+        for artist_id in range(1, artists + 1):
+            # One featured artist per song, so each song writes an edge in each direction
+            songs = [(artist_id * songs_per_artist + i, [artist_id, -(artist_id * songs_per_artist + i)]) for i in range(songs_per_artist)]
+            db.save_songs(songs, fetched_artist_id=artist_id)
+        seconds = time.perf_counter() - start
+    finally:
+        db.close()
+    rows = artists * songs_per_artist * 2
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds}
+
+
+def bench_startup(repeats):
+    """Launch main.py until its menu first paints; returns the reported and wall-clock times."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", RAPBATTLE_EXIT_AFTER_FIRST_PAINT="1")
+    for name in ("RAPBATTLE_TRACE_FILE", "RAPBATTLE_PROFILE"):
+        env.pop(name, None)
+    first_paint = []
+    process = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "main.py"], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True, timeout=60
+        ).stdout
+        process.append((time.perf_counter() - start) * 1000)
+        first_paint.append(float(output.split("First paint after ")[1].split()[0]))
+    return {"first_paint_ms": statistics.median(first_paint), "process_ms": statistics.median(process)}
+
+
+def measure(engine_module, genius_api, CollaborationDB, stub, fixture, moves, page_repeats, startup_repeats):
+    """Run every benchmark phase and return the results dict."""
+    results = {}
+    tracemalloc.start()
+    stub.reset_counters()
+    latencies, outcomes = run_turns(lambda: engine_module.GameEngine("bench"), moves, engine_module.CollaborationLookupError)
+    results["cold"] = dict(summarize(latencies), outcomes=outcomes, requests=dict(stub.counters))
+
+    # Same moves again with a new engine: in-memory caches are empty, SQLite is warm
+    stub.reset_counters()
+    latencies, outcomes = run_turns(lambda: engine_module.GameEngine("bench"), moves, engine_module.CollaborationLookupError)
+    results["warm"] = dict(summarize(latencies), outcomes=outcomes, requests=dict(stub.counters))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results["pages"] = bench_pages(genius_api, stub, fixture, page_repeats)
+    results["db"] = bench_db(CollaborationDB, "bench_writes.db", 200, 100)
+    results["startup"] = bench_startup(startup_repeats)
+    results["memory"] = {
+        "peak_traced_mb": peak / 2 ** 20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    return results
+
+
+def git_version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results):
+    flat = {}
+    for section, values in results.items():
+        if isinstance(values, dict):
+            for key, value in values.items():
+                flat[f"{section}.{key}"] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against a baseline results file."""
+    current = flatten(results)
+    previous = flatten(baseline["results"])
+    regressions = []
+    for metric, higher_is_better in METRICS.items():
+        if metric not in current or not previous.get(metric):
+            continue
+        change = (current[metric] - previous[metric]) / previous[metric]
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{metric}: {previous[metric]:.3f} -> {current[metric]:.3f} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark turn latency against a local stub Genius server.")
+    parser.add_argument("--fixture", help="recorded fixture JSON to serve instead of a synthetic graph")
+    parser.add_argument("--save-fixture", help="write the fixture that was used to this path")
+    parser.add_argument("--artists", type=int, default=300, help="synthetic graph size")
+    parser.add_argument("--songs", type=int, default=160, help="max songs per synthetic artist")
+    parser.add_argument("--features", type=int, default=2, help="max featured artists per synthetic song")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--invalid-rate", type=float, default=0.2, help="share of deliberately wrong answers")
+    parser.add_argument("--latency", type=float, default=30.0, help="stub latency per request in ms")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="client requests per second (default 0: unlimited, to measure the game rather than the limiter)")
+    parser.add_argument("--page-repeats", type=int, default=5)
+    parser.add_argument("--startup-repeats", type=int, default=5, help="launches of main.py timed to first paint")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the JSON results here as well as to stdout")
+    parser.add_argument("--compare", help="baseline results JSON; exit 1 if a metric regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    args = parser.parse_args(argv)
+
+    fixture = load_fixture(args.fixture) if args.fixture else make_fixture(args.artists, args.songs, args.features, args.seed)
+    if args.save_fixture:
+        save_fixture(fixture, args.save_fixture)
+
+    stub = StubGenius(fixture, latency=args.latency / 1000, rate_429=args.rate_429, seed=args.seed).start()
+
+    # Everything below must see the stub and a scratch working directory before the game is imported
+    os.environ["GENIUS_API_ROOT"] = stub.url
+    os.environ["GENIUS_API_TOKEN"] = "bench"
+    os.environ["GENIUS_RATE_LIMIT"] = str(args.rate_limit)
+    os.environ.pop("RAPBATTLE_OFFLINE_SNAPSHOT", None)
+    workdir = tempfile.TemporaryDirectory(prefix="rapbattle-bench-")
+    os.chdir(workdir.name)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    import genius_api
+    from collab_db import CollaborationDB
+    import engine as engine_module
+
+    moves = plan_turns(fixture, args.turns, args.invalid_rate, args.seed)
+
+    # The game logs progress with print(); keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        results = measure(engine_module, genius_api, CollaborationDB, stub, fixture, moves, args.page_repeats, args.startup_repeats)
+
+    report = {
+        "version": git_version(),
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+
+    stub.stop()
+    os.chdir(REPO_ROOT)
+    workdir.cleanup()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Local stand-in for the Genius /search and /artists/{id}/songs endpoints.
+
+Serves a fixture, either generated with make_fixture or loaded from a JSON
+file recorded earlier, with configurable latency and 429 rate. Bodies are
+gzipped for clients that accept it, as the real API does:
+
+    {"artists": {"<id>": "<name>", ...},
+     "songs": [{"id": 1, "title": .., "release_date": "YYYY-MM-DD" or null,
+                "primary_artist": {"id": .., "name": ..},
+                "featured_artists": [{"id": .., "name": ..}, ...]}, ...]}
+
+Song pages honour the API's sort parameter: "title" (the default) and
+"popularity" list songs by title, "release_date" lists the newest release
+first, with undated songs last.
+"""
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from artist_names import normalize_artist_name
+
+_SONGS_PATH = re.compile(r"^/artists/(\d+)/songs$")
+
+
+def make_fixture(artist_count=500, songs_per_artist=120, features_per_song=2, seed=1):
+    """Generate a synthetic collaboration graph with a heavy-tailed popularity curve."""
+    rng = random.Random(seed)
+    artists = {artist_id: f"Artist {artist_id}" for artist_id in range(1, artist_count + 1)}
+    ids = list(artists)
+    # A few artists feature on most songs, like real rap discographies
+    weights = [1 / rank for rank in range(1, artist_count + 1)]
+    songs = []
+    song_id = 1
+    for artist_id in ids:
+        for _ in range(rng.randint(songs_per_artist // 4, songs_per_artist)):
+            featured = {rng.choices(ids, weights)[0] for _ in range(rng.randint(0, features_per_song))}
+            featured.discard(artist_id)
+            songs.append({
+                "id": song_id,
+                "title": f"Song {song_id}",
+                "release_date": None,
+                "primary_artist": {"id": artist_id, "name": artists[artist_id]},
+                "featured_artists": [{"id": f, "name": artists[f]} for f in sorted(featured)],
+            })
+            song_id += 1
+    # Dated from a separate generator so the graph for a seed stays the same. Release
+    # dates mostly follow song IDs, but some songs are added to Genius long after release
+    dates = random.Random(seed + 1)
+    first = date(2000, 1, 1)
+    for song in songs:
+        released = first + timedelta(days=song["id"] * 9000 // song_id)
+        if dates.random() < 0.1:
+            released -= timedelta(days=dates.randint(30, 3000))
+        song["release_date"] = max(released, first).isoformat()
+    return {"artists": artists, "songs": songs}
+
+
+def load_fixture(path):
+    with open(path, encoding="utf-8") as f:
+        fixture = json.load(f)
+    fixture["artists"] = {int(artist_id): name for artist_id, name in fixture["artists"].items()}
+    return fixture
+
+
+def save_fixture(fixture, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixture, f)
+
+
+class StubGenius:
+    """Threaded HTTP server answering like the Genius API, bound to 127.0.0.1."""
+    def __init__(self, fixture, latency=0.0, rate_429=0.0, seed=1):
+        self.fixture = fixture
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.counters = defaultdict(int)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.by_alias = {normalize_artist_name(name): artist_id for artist_id, name in fixture["artists"].items()}
+        # Songs are listed on the pages of every artist credited on them, by title
+        self.discographies = defaultdict(list)
+        for song in sorted(fixture["songs"], key=lambda song: (song.get("title") or "", song["id"])):
+            credited = {song["primary_artist"]["id"]} | {a["id"] for a in song["featured_artists"]}
+            for artist_id in credited:
+                self.discographies[artist_id].append(song)
+        # The same lists for sort=release_date: newest release first, undated songs last
+        self.by_release = {
+            artist_id: sorted(songs, key=lambda song: song.get("release_date") or "", reverse=True)
+            for artist_id, songs in self.discographies.items()
+        }
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-genius", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.counters.clear()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def handle(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlparse(request.path)
+        query = parse_qs(url.query)
+        with self._lock:
+            throttled = self.rate_429 and self._rng.random() < self.rate_429
+        if throttled:
+            self._count("429")
+            self.send(request, 429, {"meta": {"status": 429}}, {"Retry-After": "0"})
+            return
+
+        match = _SONGS_PATH.match(url.path)
+        if url.path == "/search":
+            self._count("search")
+            self.send(request, 200, self.search(query.get("q", [""])[0]))
+        elif match:
+            self._count("songs")
+            page = int(query.get("page", ["1"])[0])
+            per_page = min(int(query.get("per_page", ["20"])[0]), 50)
+            sort = query.get("sort", ["title"])[0]
+            self.send(request, 200, self.songs(int(match.group(1)), page, per_page, sort))
+        else:
+            self._count("404")
+            self.send(request, 404, {"meta": {"status": 404}})
+
+    def search(self, q):
+        artist_id = self.by_alias.get(normalize_artist_name(q))
+        hits = []
+        if artist_id is not None:
+            artist = {"id": artist_id, "name": self.fixture["artists"][artist_id], "image_url": None}
+            hits.append({"type": "song", "result": {"primary_artist": artist}})
+        return {"meta": {"status": 200}, "response": {"hits": hits}}
+
+    def songs(self, artist_id, page, per_page, sort="title"):
+        songs = (self.by_release if sort == "release_date" else self.discographies).get(artist_id, [])
+        start = (page - 1) * per_page
+        next_page = page + 1 if start + per_page < len(songs) else None
+        return {"meta": {"status": 200}, "response": {"songs": songs[start:start + per_page], "next_page": next_page}}
+
+    def send(self, request, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+        if gzipped:
+            payload = gzip.compress(payload, compresslevel=6)
+        self._count("bytes", len(payload))
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json; charset=utf-8")
+        if gzipped:
+            request.send_header("Content-Encoding", "gzip")
+        request.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
@@ -0,0 +1,91 @@
+"""Size-bounded in-process caches for sessions that run for days."""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Names resolved to artists kept in memory; older ones are looked up in SQLite again
+ARTIST_CACHE_SIZE = int(os.getenv("RAPBATTLE_ARTIST_CACHE_SIZE", "5000"))
+
+
+def intern_name(name):
+    """Share one string object per distinct display name across every cache and index."""
+    return sys.intern(name) if name is not None else None
+
+
+class ArtistRecord:
+    """A cached artist: integer ID, interned display name and image URL."""
+    __slots__ = ("id", "name", "image_url")
+
+    def __init__(self, artist_id, name, image_url=None):
+        self.id = artist_id
+        self.name = intern_name(name)
+        self.image_url = image_url
+
+    @classmethod
+    def from_dict(cls, artist_data):
+        return cls(artist_data["id"], artist_data["name"], artist_data.get("image_url"))
+
+    def to_dict(self):
+        """The artist data dict the rest of the game passes around; a new one each call."""
+        return {"id": self.id, "name": self.name, "image_url": self.image_url}
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sum(sys.getsizeof(getattr(self, slot)) for slot in self.__slots__)
+
+
+class LRUCache:
+    """Thread-safe mapping that keeps the max_entries most recently used entries.
+
+    Counts hits, misses and evictions, and keeps a running estimate of the
+    memory its keys and values use (sys.getsizeof, so values shared between
+    entries are counted once per entry). Callers fall back to slower storage
+    on a miss.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, estimated bytes)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,408 @@
+"""SQLite cache of artists, the songs that credit them and the collaborations between them."""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DB_PATH = "collaborations.db"
+# Most idle connections kept open for reuse; more are opened while calls overlap
+DB_POOL_SIZE = 4
+
+# Bump this and add a step to MIGRATIONS whenever the schema changes
+SCHEMA_VERSION = 8
+
+# How long a resolved artist name is trusted before searching again
+ALIAS_TTL = 30 * 24 * 60 * 60
+# How long a name that returned no search hits is remembered as missing
+NEGATIVE_ALIAS_TTL = 24 * 60 * 60
+
+
+def _migrate_to_v1(connection):
+    """Replace the original unkeyed collaborations table with artists + edge tables."""
+    legacy = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'collaborations'"
+    ).fetchone()
+    if legacy:
+        connection.execute("ALTER TABLE collaborations RENAME TO collaborations_v0")
+
+    connection.execute("""
+        CREATE TABLE artists (
+            artist_id INTEGER PRIMARY KEY,
+            name TEXT,
+            fetched_at REAL,
+            collaborator_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # The primary key doubles as the covering index for "collaborators of artist X"
+    connection.execute("""
+        CREATE TABLE collaborations (
+            artist_id INTEGER NOT NULL,
+            collaborator TEXT NOT NULL,
+            PRIMARY KEY (artist_id, collaborator)
+        ) WITHOUT ROWID
+    """)
+    connection.execute("CREATE INDEX idx_collaborations_collaborator ON collaborations (collaborator, artist_id)")
+
+    if legacy:
+        connection.execute("""
+            INSERT OR IGNORE INTO collaborations (artist_id, collaborator)
+            SELECT CAST(artist_id AS INTEGER), lower(collaborator_name)
+            FROM collaborations_v0
+            WHERE artist_id IS NOT NULL AND collaborator_name IS NOT NULL
+        """)
+        # Legacy rows were only written after a full crawl, so treat those artists as fetched.
+        # Their fetch time is unknown, so they are dated to the epoch.
+        connection.execute("""
+            INSERT INTO artists (artist_id, fetched_at, collaborator_count)
+            SELECT artist_id, 0, COUNT(*) FROM collaborations GROUP BY artist_id
+        """)
+        connection.execute("DROP TABLE collaborations_v0")
+
+
+def _migrate_to_v2(connection):
+    """Add the persistent artist-name resolution cache."""
+    connection.execute("ALTER TABLE artists ADD COLUMN image_url TEXT")
+    # artist_id is NULL for names that returned no search hits
+    connection.execute("""
+        CREATE TABLE artist_aliases (
+            alias TEXT PRIMARY KEY,
+            artist_id INTEGER,
+            resolved_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def _migrate_to_v3(connection):
+    """Count how many songs each collaboration appears on, for ranking."""
+    connection.execute("ALTER TABLE collaborations ADD COLUMN song_count INTEGER NOT NULL DEFAULT 1")
+
+
+def _migrate_to_v4(connection):
+    """Record the newest song seen per artist so refreshes can stop early."""
+    connection.execute("ALTER TABLE artists ADD COLUMN newest_song_id INTEGER")
+
+
+def _migrate_to_v5(connection):
+    """Key collaborations by Genius artist ID instead of lowercased display name.
+
+    Display names can't be mapped back to IDs reliably, so cached discographies
+    are dropped and crawled again on demand. Resolved aliases are kept.
+    """
+    connection.execute("DROP TABLE collaborations")
+    connection.execute("""
+        CREATE TABLE collaborations (
+            artist_id INTEGER NOT NULL,
+            collaborator_id INTEGER NOT NULL,
+            song_count INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (artist_id, collaborator_id)
+        ) WITHOUT ROWID
+    """)
+    connection.execute("CREATE INDEX idx_collaborations_collaborator ON collaborations (collaborator_id, artist_id)")
+    connection.execute("UPDATE artists SET fetched_at = NULL, newest_song_id = NULL, collaborator_count = 0")
+
+
+def _migrate_to_v6(connection):
+    """Store songs once and derive collaborations from them in both directions.
+
+    Song counts must come from deduplicated songs, so the collaborations
+    cached from discographies before songs were stored are dropped and
+    crawled again on demand.
+    """
+    connection.execute("""
+        CREATE TABLE songs (
+            song_id INTEGER PRIMARY KEY,
+            primary_artist_id INTEGER NOT NULL
+        )
+    """)
+    # Every artist credited on a song, the primary artist included
+    connection.execute("""
+        CREATE TABLE song_artists (
+            artist_id INTEGER NOT NULL,
+            song_id INTEGER NOT NULL,
+            PRIMARY KEY (artist_id, song_id)
+        ) WITHOUT ROWID
+    """)
+    connection.execute("DELETE FROM collaborations")
+    connection.execute("UPDATE artists SET fetched_at = NULL, newest_song_id = NULL, collaborator_count = 0")
+
+
+def _migrate_to_v7(connection):
+    """Forget aliases resolved to artists whose names normalization used to strip down.
+
+    Non-Latin letters used to be dropped from the normalized key, so an alias
+    like "m" could point at "MØ". Those rows are resolved again on demand.
+    """
+    connection.execute("""
+        DELETE FROM artist_aliases
+        WHERE artist_id IN (SELECT artist_id FROM artists WHERE name GLOB '*[^ -~]*')
+    """)
+
+
+def _migrate_to_v8(connection):
+    """Drop what nothing reads since edges are stored in both directions.
+
+    The reverse index on collaborations only served "who credits X", which
+    is now a primary-key lookup, and artists.collaborator_count was only
+    ever written. SQLite before 3.35 can't drop a column, so there it stays.
+    """
+    connection.execute("DROP INDEX IF EXISTS idx_collaborations_collaborator")
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        connection.execute("ALTER TABLE artists DROP COLUMN collaborator_count")
+
+
+MIGRATIONS = {
+    1: _migrate_to_v1,
+    2: _migrate_to_v2,
+    3: _migrate_to_v3,
+    4: _migrate_to_v4,
+    5: _migrate_to_v5,
+    6: _migrate_to_v6,
+    7: _migrate_to_v7,
+    8: _migrate_to_v8,
+}
+
+
+def configure_connection(connection):
+    """Apply the pragmas every connection uses."""
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("PRAGMA temp_store = MEMORY")
+    connection.execute("PRAGMA cache_size = -8000")  # ~8 MB page cache
+    connection.execute("PRAGMA busy_timeout = 5000")
+
+
+def migrate(connection):
+    """Bring the database up to SCHEMA_VERSION, one migration at a time."""
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    while version < SCHEMA_VERSION:
+        version += 1
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            MIGRATIONS[version](connection)
+            connection.execute(f"PRAGMA user_version = {version}")
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+
+class CollaborationDB:
+    """Collaboration cache shared between the GUI thread and background workers.
+
+    Every call borrows a connection from a small pool and returns it when
+    done, so the many short-lived crawl, prefetch and refresh threads don't
+    each leave a connection open. WAL mode lets readers proceed while a
+    writer commits.
+    """
+    def __init__(self, path=DB_PATH, pool_size=DB_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._idle = []  # Connections not currently borrowed, at most pool_size
+        self._idle_lock = threading.Lock()
+        self._closed = False
+        with self.connection() as connection:
+            migrate(connection)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block, opening one if none is idle."""
+        with self._idle_lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            # isolation_level=None so transactions are only opened explicitly
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            configure_connection(connection)
+        try:
+            yield connection
+        finally:
+            with self._idle_lock:
+                keep = not self._closed and len(self._idle) < self.pool_size
+                if keep:
+                    self._idle.append(connection)
+            if not keep:
+                connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and run the with block in one write transaction."""
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """Close the idle connections; borrowed ones are closed when they are returned."""
+        with self._idle_lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def get_collaborators(self, artist_id):
+        """Return the cached set of collaborator IDs, or None if the artist was never fully fetched.
+
+        An artist that was fetched but has no collaborators returns an empty set.
+        """
+        with self.connection() as connection:
+            fetched = connection.execute(
+                "SELECT fetched_at FROM artists WHERE artist_id = ?", (artist_id,)
+            ).fetchone()
+            if fetched is None or fetched[0] is None:
+                return None
+            rows = connection.execute(
+                "SELECT collaborator_id FROM collaborations WHERE artist_id = ?", (artist_id,)
+            ).fetchall()
+            return {row[0] for row in rows}
+
+    def has_edge(self, artist_id, other_id):
+        """True if any cached song credits both artists.
+
+        Edges are stored in both directions, so this is one primary-key probe
+        whether or not either artist's own discography was crawled.
+        """
+        with self.connection() as connection:
+            return connection.execute(
+                "SELECT 1 FROM collaborations WHERE artist_id = ? AND collaborator_id = ?",
+                (artist_id, other_id)
+            ).fetchone() is not None
+
+    def known_degree(self, artist_id):
+        """Number of collaborators cached songs credit the artist with; a proxy for how prolific they are."""
+        with self.connection() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM collaborations WHERE artist_id = ?", (artist_id,)
+            ).fetchone()[0]
+
+    def fetch_state(self, artist_id):
+        """Return (fetched_at, newest_song_id) for a fully fetched artist, or None."""
+        with self.connection() as connection:
+            return connection.execute(
+                "SELECT fetched_at, newest_song_id FROM artists WHERE artist_id = ? AND fetched_at IS NOT NULL",
+                (artist_id,)
+            ).fetchone()
+
+    def image_url(self, artist_id):
+        """The artist's image URL if a search has recorded it, else None."""
+        with self.connection() as connection:
+            row = connection.execute("SELECT image_url FROM artists WHERE artist_id = ?", (artist_id,)).fetchone()
+            return row[0] if row else None
+
+    def top_collaborators(self, artist_id, limit):
+        """Return up to limit collaborator names, most frequent first."""
+        with self.connection() as connection:
+            rows = connection.execute(
+                """
+                SELECT artists.name
+                FROM collaborations
+                JOIN artists ON artists.artist_id = collaborations.collaborator_id
+                WHERE collaborations.artist_id = ? AND artists.name IS NOT NULL
+                ORDER BY collaborations.song_count DESC
+                LIMIT ?
+                """,
+                (artist_id, limit)
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def save_songs(self, songs, names=None, fetched_artist_id=None, newest_song_id=None):
+        """Store songs and the collaborations they imply, in a single transaction.
+
+        songs is an iterable of (song_id, credited artist IDs) with the primary
+        artist first, and names an optional mapping of artist ID to display
+        name. Every pair of artists credited on a song becomes an edge in both
+        directions. Songs already stored are skipped, so a song counts once
+        toward song_count however many discographies it was crawled from.
+
+        fetched_artist_id, if given, is the artist whose discography songs
+        completes: it is marked as fully fetched up to newest_song_id.
+        Returns the songs that were new.
+        """
+        with self.transaction() as connection:
+            new_songs = []
+            for song_id, artist_ids in songs:
+                if connection.execute(
+                    "INSERT OR IGNORE INTO songs (song_id, primary_artist_id) VALUES (?, ?)", (song_id, artist_ids[0])
+                ).rowcount:
+                    new_songs.append((song_id, artist_ids))
+            connection.executemany(
+                "INSERT OR IGNORE INTO song_artists (artist_id, song_id) VALUES (?, ?)",
+                ((artist_id, song_id) for song_id, artist_ids in new_songs for artist_id in artist_ids)
+            )
+            connection.executemany(
+                """
+                INSERT INTO collaborations (artist_id, collaborator_id, song_count) VALUES (?, ?, 1)
+                ON CONFLICT (artist_id, collaborator_id) DO UPDATE SET song_count = song_count + 1
+                """,
+                ((a, b) for _, artist_ids in new_songs for a in artist_ids for b in artist_ids if a != b)
+            )
+            if names:
+                connection.executemany(
+                    """
+                    INSERT INTO artists (artist_id, name) VALUES (?, ?)
+                    ON CONFLICT (artist_id) DO UPDATE SET name = excluded.name
+                    """,
+                    names.items()
+                )
+            if fetched_artist_id is not None:
+                connection.execute(
+                    """
+                    INSERT INTO artists (artist_id, fetched_at, newest_song_id)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (artist_id) DO UPDATE SET
+                        fetched_at = excluded.fetched_at,
+                        newest_song_id = MAX(COALESCE(excluded.newest_song_id, 0), COALESCE(newest_song_id, 0))
+                    """,
+                    (fetched_artist_id, time.time(), newest_song_id)
+                )
+        return new_songs
+
+    def resolve_alias(self, alias):
+        """Look up a normalized artist name.
+
+        Returns (hit, artist_data). hit is False when the name is unknown or its
+        entry expired; artist_data is None for a cached "no such artist".
+        """
+        with self.connection() as connection:
+            row = connection.execute(
+                """
+                SELECT a.artist_id, a.resolved_at, artists.name, artists.image_url
+                FROM artist_aliases AS a
+                LEFT JOIN artists ON artists.artist_id = a.artist_id
+                WHERE a.alias = ?
+                """,
+                (alias,)
+            ).fetchone()
+        if row is None:
+            return False, None
+
+        artist_id, resolved_at, name, image_url = row
+        ttl = ALIAS_TTL if artist_id is not None else NEGATIVE_ALIAS_TTL
+        if time.time() - resolved_at > ttl:
+            return False, None
+        if artist_id is None:
+            return True, None
+        return True, {"id": artist_id, "name": name, "image_url": image_url}
+
+    def save_alias(self, aliases, artist_data):
+        """Remember what the given normalized names resolve to (None for no match)."""
+        now = time.time()
+        artist_id = artist_data["id"] if artist_data else None
+        with self.transaction() as connection:
+            if artist_data:
+                connection.execute(
+                    """
+                    INSERT INTO artists (artist_id, name, image_url)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (artist_id) DO UPDATE SET
+                        name = excluded.name,
+                        image_url = excluded.image_url
+                    """,
+                    (artist_id, artist_data["name"], artist_data["image_url"])
+                )
+            connection.executemany(
+                "INSERT OR REPLACE INTO artist_aliases (alias, artist_id, resolved_at) VALUES (?, ?, ?)",
+                ((alias, artist_id, now) for alias in set(aliases))
+            )
@@ -0,0 +1,182 @@
+"""In-memory adjacency index of the cached collaboration graph, for the CPU opponent."""
+import heapq
+import random
+import threading
+import time
+from array import array
+from collections import Counter
+
+from caches import LRUCache, intern_name
+from graph_snapshot import GraphSnapshot
+from instrumentation import recorder
+
+# Highest-degree artists the CPU picks from when it opens a round
+OPENING_CHOICES = 25
+# Artists whose collaborators are kept ordered by degree for best_answer()
+ORDERED_ARTISTS = 1024
+
+
+class CollaborationIndex:
+    """Undirected adjacency sets and names of every cached collaboration.
+
+    Loaded once from the database on a background thread, then kept current
+    by add_songs() as new songs are cached, so picking a move
+    never goes back to SQLite. Degrees are kept alongside the adjacency sets
+    so ranking candidates is a dict lookup each. All methods are thread-safe.
+    """
+    def __init__(self):
+        self.adjacency = {}  # artist_id -> set of collaborator ids
+        self.degrees = {}  # artist_id -> len(adjacency[artist_id])
+        self.names = {}  # artist_id -> interned display name
+        self._ids = {}  # artist_id -> the one int object used for it everywhere in the index
+        # artist_id -> (degree when sorted, collaborator ids by ascending degree, their degrees then)
+        self._by_degree = LRUCache(ORDERED_ARTISTS)
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+
+    def load_in_background(self, source):
+        """Load from a CollaborationDB or GraphSnapshot on a background thread."""
+        load = self.load_snapshot if isinstance(source, GraphSnapshot) else self.load
+        thread = threading.Thread(target=load, args=(source,), name="index", daemon=True)
+        thread.start()
+
+    def load(self, db):
+        """Read every cached collaboration from db into the index."""
+        start = time.perf_counter()
+        try:
+            with db.connection() as connection:
+                names = connection.execute("SELECT artist_id, name FROM artists WHERE name IS NOT NULL")
+                with self._lock:
+                    self.names.update((artist_id, intern_name(name)) for artist_id, name in names)
+                # Edges are stored in both directions; _link adds both from one row
+                edges = connection.execute("SELECT artist_id, collaborator_id FROM collaborations WHERE artist_id < collaborator_id")
+                while True:
+                    rows = edges.fetchmany(10000)
+                    if not rows:
+                        break
+                    with self._lock:
+                        for artist_id, collaborator_id in rows:
+                            self._link(artist_id, collaborator_id)
+        finally:
+            self._loaded.set()
+        self._loaded_after(start)
+
+    def load_snapshot(self, snapshot):
+        """Read the offline snapshot's whole graph into the index."""
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                for artist_id in snapshot.artist_ids():
+                    self.names[artist_id] = intern_name(snapshot.name(artist_id))
+                    for collaborator_id in snapshot.neighbors(artist_id):
+                        self._link(artist_id, collaborator_id)
+        finally:
+            self._loaded.set()
+        self._loaded_after(start)
+
+    def _loaded_after(self, start):
+        recorder.add_span("index.load", start, time.perf_counter())
+        print(f"Indexed {len(self.adjacency)} artists in {time.perf_counter() - start:.2f}s")
+
+    def wait_loaded(self, timeout=None):
+        return self._loaded.wait(timeout)
+
+    def _link(self, a, b):
+        # Each row read from SQLite is a new int object; keep one per artist instead of one per edge
+        a = self._ids.setdefault(a, a)
+        b = self._ids.setdefault(b, b)
+        for artist_id, other_id in ((a, b), (b, a)):
+            neighbors = self.adjacency.setdefault(artist_id, set())
+            if other_id not in neighbors:
+                neighbors.add(other_id)
+                self.degrees[artist_id] = len(neighbors)
+
+    def add_songs(self, songs, names=None):
+        """Link everyone credited on newly cached (song ID, artist IDs) songs."""
+        with self._lock:
+            for _, artist_ids in songs:
+                for i, artist_id in enumerate(artist_ids):
+                    for other_id in artist_ids[i + 1:]:
+                        self._link(artist_id, other_id)
+            if names:
+                self.names.update((artist_id, intern_name(name)) for artist_id, name in names.items())
+
+    def degree(self, artist_id):
+        return self.degrees.get(artist_id, 0)
+
+    def has_edge(self, artist_id, other_id):
+        return other_id in self.adjacency.get(artist_id, ())
+
+    def open_round(self, used_ids=(), rng=random):
+        """Pick a well-connected artist to open a round with; returns an ID or None."""
+        with self._lock:
+            # Over-fetch by the number of excluded artists instead of filtering all of them first
+            top = heapq.nlargest(OPENING_CHOICES + len(used_ids), self.degrees, key=self.degrees.__getitem__)
+            ranked = [artist_id for artist_id in top if artist_id in self.names and artist_id not in used_ids]
+            if len(ranked) < OPENING_CHOICES and len(top) < len(self.degrees):
+                ranked = heapq.nlargest(
+                    OPENING_CHOICES,
+                    (artist_id for artist_id in self.names if artist_id in self.degrees and artist_id not in used_ids),
+                    key=self.degrees.__getitem__
+                )
+        return rng.choice(ranked[:OPENING_CHOICES]) if ranked else None
+
+    def _collaborators_by_degree(self, artist_id):
+        """The artist's collaborators in ascending order of degree, and those degrees.
+
+        Sorted on first use and kept until the artist gains a collaborator.
+        Degrees only grow, so the stored ones stay lower bounds of the
+        current ones as other artists gain collaborators.
+        """
+        neighbors = self.adjacency.get(artist_id, ())
+        cached = self._by_degree.get(artist_id)
+        if cached is not None and cached[0] == len(neighbors):
+            return cached[1], cached[2]
+        ordered = sorted(neighbors, key=self.degrees.__getitem__)
+        ordered_degrees = array("i", map(self.degrees.__getitem__, ordered))
+        self._by_degree.put(artist_id, (len(neighbors), ordered, ordered_degrees))
+        return ordered, ordered_degrees
+
+    def best_answer(self, current_id, used_ids, rng=random):
+        """The unused collaborator of current_id that leaves the fewest unused answers. ID or None.
+
+        A candidate leaves its degree minus however many of its collaborators
+        were already named. Candidates next to a named artist are scored from
+        set intersections with the named artists' collaborators; the others
+        leave their whole degree, so they are walked in ascending degree
+        order only until the degree can no longer beat the best answer.
+        """
+        with self._lock:
+            neighbors = self.adjacency.get(current_id)
+            if not neighbors:
+                return None
+            degrees = self.degrees
+            names = self.names
+            # How many of each candidate's collaborators were already named
+            named = Counter()
+            for used in used_ids:
+                named.update(self.adjacency.get(used, set()) & neighbors)
+
+            best_options = None
+            best = []
+            for candidate, count in named.items():
+                if candidate in used_ids or candidate not in names:
+                    continue
+                options = degrees[candidate] - count
+                if best_options is None or options < best_options:
+                    best_options, best = options, [candidate]
+                elif options == best_options:
+                    best.append(candidate)
+
+            ordered, ordered_degrees = self._collaborators_by_degree(current_id)
+            for candidate, lower_bound in zip(ordered, ordered_degrees):
+                if best_options is not None and lower_bound > best_options:
+                    break
+                if candidate in named or candidate in used_ids or candidate not in names:
+                    continue
+                options = degrees[candidate]
+                if best_options is None or options < best_options:
+                    best_options, best = options, [candidate]
+                elif options == best_options:
+                    best.append(candidate)
+        return rng.choice(best) if best else None
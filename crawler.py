@@ -0,0 +1,198 @@
+"""Headless crawler that builds an offline collaboration snapshot.
+
+Walks the Genius songs endpoint breadth-first from a list of seed artists.
+Progress is checkpointed to an SQLite state file after every artist, so an
+interrupted crawl picks up where it stopped when run again.
+
+    python crawler.py --seeds "Drake" "Kendrick Lamar" --max-artists 2000
+    python crawler.py --resume            # continue the crawl in crawl_state.db
+    python crawler.py --build-only        # just rewrite the snapshot
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from itertools import combinations
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+import genius_api
+from collab_db import configure_connection
+from graph_snapshot import write_snapshot
+
+STATE_PATH = "crawl_state.db"
+SNAPSHOT_PATH = "collaborations.snap"
+# An artist whose discography keeps failing is dropped after this many attempts
+MAX_ATTEMPTS = 3
+
+
+def open_state(path):
+    """Open (creating if needed) the crawl checkpoint database."""
+    connection = sqlite3.connect(path, isolation_level=None)
+    configure_connection(connection)
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS artists (
+            artist_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS edges (
+            artist_id INTEGER NOT NULL,
+            other_id INTEGER NOT NULL,
+            PRIMARY KEY (artist_id, other_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS queue (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            artist_id INTEGER NOT NULL UNIQUE,
+            depth INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS crawled (
+            artist_id INTEGER PRIMARY KEY
+        );
+    """)
+    return connection
+
+
+def resolve_seed(name, token):
+    """Return (artist_id, name) for a seed name, or None if Genius has no match."""
+    response = genius_api.api_get("/search", token, params={"q": name})
+    if response.status_code != 200:
+        print(f"Error searching for {name!r}: {response.status_code}")
+        return None
+    hits = response.json()["response"]["hits"]
+    if not hits:
+        return None
+    artist = hits[0]["result"]["primary_artist"]
+    return artist["id"], artist["name"]
+
+
+def enqueue_seeds(state, seeds, token):
+    for seed in seeds:
+        resolved = resolve_seed(seed, token)
+        if resolved is None:
+            print(f"No Genius artist found for seed {seed!r}, skipping")
+            continue
+        artist_id, name = resolved
+        state.execute("INSERT OR IGNORE INTO artists (artist_id, name) VALUES (?, ?)", (artist_id, name))
+        state.execute(
+            "INSERT OR IGNORE INTO queue (artist_id, depth) "
+            "SELECT ?, 0 WHERE NOT EXISTS (SELECT 1 FROM crawled WHERE artist_id = ?)",
+            (artist_id, artist_id)
+        )
+
+
+def crawl_artist(state, artist_id, depth, attempts, token, max_depth):
+    """Fetch one discography and checkpoint its edges.
+
+    Returns the number of songs seen, or None if the fetch failed and was requeued.
+    """
+    songs, stats = genius_api.fetch_artist_songs(artist_id, token)
+    if not stats.complete:
+        state.execute("BEGIN IMMEDIATE")
+        if attempts + 1 >= MAX_ATTEMPTS:
+            print(f"Giving up on artist {artist_id} after {MAX_ATTEMPTS} attempts")
+            state.execute("DELETE FROM queue WHERE artist_id = ?", (artist_id,))
+        else:
+            # Move it to the back of the queue and try again later
+            state.execute("DELETE FROM queue WHERE artist_id = ?", (artist_id,))
+            state.execute(
+                "INSERT INTO queue (artist_id, depth, attempts) VALUES (?, ?, ?)",
+                (artist_id, depth, attempts + 1)
+            )
+        state.execute("COMMIT")
+        return None
+
+    artists = {}
+    edges = set()
+    for song in songs:
+        artists.update(song.artists)
+        # Everyone credited on a song has featured with everyone else on it
+        for a, b in combinations([artist_id for artist_id, _ in song.artists], 2):
+            edges.add((a, b) if a < b else (b, a))
+
+    state.execute("BEGIN IMMEDIATE")
+    state.executemany("INSERT OR IGNORE INTO artists (artist_id, name) VALUES (?, ?)", artists.items())
+    state.executemany("INSERT OR IGNORE INTO edges (artist_id, other_id) VALUES (?, ?)", edges)
+    if depth < max_depth:
+        state.executemany(
+            "INSERT OR IGNORE INTO queue (artist_id, depth) "
+            "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM crawled WHERE artist_id = ?)",
+            ((other_id, depth + 1, other_id) for other_id in artists if other_id != artist_id)
+        )
+    state.execute("DELETE FROM queue WHERE artist_id = ?", (artist_id,))
+    state.execute("INSERT OR IGNORE INTO crawled (artist_id) VALUES (?)", (artist_id,))
+    state.execute("COMMIT")
+    return len(songs)
+
+
+def crawl(state, token, max_artists, max_depth):
+    """Crawl queued artists breadth-first until the queue is empty or max_artists is reached."""
+    crawled = state.execute("SELECT COUNT(*) FROM crawled").fetchone()[0]
+    start = time.perf_counter()
+    while crawled < max_artists:
+        row = state.execute("SELECT artist_id, depth, attempts FROM queue ORDER BY seq LIMIT 1").fetchone()
+        if row is None:
+            break
+        artist_id, depth, attempts = row
+        song_count = crawl_artist(state, artist_id, depth, attempts, token, max_depth)
+        if song_count is not None:
+            crawled += 1
+            queued = state.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+            rate = crawled / (time.perf_counter() - start)
+            print(f"[{crawled}/{max_artists}] artist {artist_id} depth {depth}: {song_count} songs, "
+                  f"{queued} queued ({rate:.1f} artists/sec)")
+
+
+def build_snapshot(state, path):
+    """Write the crawled graph to a snapshot file, replacing any previous one atomically."""
+    artists = dict(state.execute("SELECT artist_id, name FROM artists"))
+    edges = state.execute("SELECT artist_id, other_id FROM edges")
+    partial = f"{path}.part"
+    write_snapshot(partial, artists, edges)
+    os.replace(partial, path)
+    print(f"Wrote {path}: {len(artists)} artists")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl Genius collaborations into an offline snapshot.")
+    parser.add_argument("--seeds", nargs="*", default=[], help="artist names to start from")
+    parser.add_argument("--seed-file", help="file with one seed artist name per line")
+    parser.add_argument("--resume", action="store_true", help="continue the crawl in the state file")
+    parser.add_argument("--build-only", action="store_true", help="only rebuild the snapshot from the state file")
+    parser.add_argument("--max-artists", type=int, default=1000, help="stop after this many discographies")
+    parser.add_argument("--max-depth", type=int, default=3, help="how many hops from a seed to follow")
+    parser.add_argument("--state", default=STATE_PATH, help=f"checkpoint database (default {STATE_PATH})")
+    parser.add_argument("--out", default=SNAPSHOT_PATH, help=f"snapshot to write (default {SNAPSHOT_PATH})")
+    args = parser.parse_args(argv)
+
+    state = open_state(args.state)
+    try:
+        if not args.build_only:
+            load_dotenv(dotenv_path=Path(".env"))
+            token = os.getenv("GENIUS_API_TOKEN")
+            if not token:
+                print("GENIUS_API_TOKEN is not set; add it to .env or the environment.")
+                return 1
+
+            seeds = list(args.seeds)
+            if args.seed_file:
+                seeds += [line.strip() for line in Path(args.seed_file).read_text(encoding="utf-8").splitlines() if line.strip()]
+            if not seeds and not args.resume:
+                parser.error("give --seeds/--seed-file, or --resume an existing crawl")
+            enqueue_seeds(state, seeds, token)
+
+            try:
+                crawl(state, token, args.max_artists, args.max_depth)
+            except KeyboardInterrupt:
+                print("Interrupted; run again with --resume to continue.")
+
+        build_snapshot(state, args.out)
+    finally:
+        state.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,540 @@
+"""UI-independent game rules and the artist lookups they need.
+
+GameEngine owns the caches (artist names, collaborations, the offline
+snapshot) and answers "is this a valid move?"; it is thread-safe and meant to
+be shared by every match in the process. Match holds the turn and score state
+of one two-player game on top of an engine. The Qt front end and the match
+server (server.py) are both clients of these classes.
+"""
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import genius_api
+from artist_names import normalize_artist_name
+from caches import ARTIST_CACHE_SIZE, ArtistRecord, LRUCache
+from collab_db import DB_PATH, CollaborationDB
+from collab_index import CollaborationIndex
+from graph_snapshot import GraphSnapshot
+from instrumentation import recorder, profiled
+from name_index import SUGGESTIONS, NameIndex
+
+# Path to a snapshot written by crawler.py; when set the game runs offline against it
+OFFLINE_SNAPSHOT = os.getenv("RAPBATTLE_OFFLINE_SNAPSHOT")
+
+# Cached discographies older than this are served as-is and refreshed in the background
+COLLABORATIONS_TTL = int(os.getenv("RAPBATTLE_COLLABORATIONS_TTL", str(7 * 24 * 60 * 60)))
+
+
+class CollaborationLookupError(Exception):
+    """Whether two artists collaborated couldn't be settled because a discography failed to load."""
+
+
+def collaborator_counts(songs, artist_id):
+    """Count the songs each other credited artist appears on in artist_id's discography.
+
+    Returns (Counter of artist ID -> song count, {artist ID: display name}).
+    """
+    song_counts = Counter()
+    names = {}
+    for song in songs:
+        for other_id, name in song.artists:
+            if other_id != artist_id:
+                song_counts[other_id] += 1
+                names[other_id] = name
+    return song_counts, names
+
+
+def song_credits(songs):
+    """Reduce songs to what the cache stores: (song ID, credited artist IDs, primary artist first).
+
+    Returns (list of those pairs, {artist ID: display name}).
+    """
+    credited = []
+    names = {}
+    for song in songs:
+        credited.append((song.id, [artist_id for artist_id, _ in song.artists]))
+        names.update(song.artists)
+    return credited, names
+
+
+def credits(song, artist_id):
+    """True if artist_id is the primary or a featured artist on song."""
+    return any(credited_id == artist_id for credited_id, _ in song.artists)
+
+
+def newest_song_id(songs):
+    """Return the highest song id in songs, or None if there are none."""
+    return max((song.id for song in songs), default=None)
+
+
+class GameEngine:
+    """Artist lookups and move validation shared by every match in the process.
+
+    All methods block and are safe to call from any thread: the database lends
+    each call a pooled connection, artist_cache locks itself, and identical
+    concurrent Genius requests are coalesced by genius_api. Every in-memory
+    cache is bounded or mirrors the database, so a process can run for days.
+    """
+    def __init__(self, token=None, db_path=DB_PATH, snapshot_path=OFFLINE_SNAPSHOT):
+        self.token = token
+        self.artist_cache = LRUCache(ARTIST_CACHE_SIZE)  # normalized name -> ArtistRecord; misses go to SQLite
+        self.db = CollaborationDB(db_path)
+        self.snapshot = GraphSnapshot(snapshot_path) if snapshot_path else None  # Offline collaboration graph
+        self.refreshes = {}  # artist_id -> thread refreshing that artist's stale discography
+        self.refreshes_lock = threading.Lock()
+        self.crawls = {}  # artist_id -> genius_api.SongStream crawling that artist's discography
+        self.crawls_lock = threading.Lock()
+        self.index = None  # CollaborationIndex for the CPU opponent, loaded on first use
+        self.index_lock = threading.Lock()
+        self.name_index = None  # NameIndex for input suggestions, loaded on first use
+
+    def close(self):
+        self.db.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    def wait_for_crawls(self):
+        """Block until every background crawl has finished and been cached."""
+        with self.crawls_lock:
+            streams = list(self.crawls.values())
+        for stream in streams:
+            stream.wait()
+
+    def fetch_collaborations(self, artist_id, budget=None):
+        """Fetch the IDs of all artists credited across the artist's entire discography.
+
+        budget is an optional genius_api.RequestBudget. Only complete crawls are cached;
+        one cut short by the budget or an error is returned but fetched again next time.
+        A stale cached discography is returned immediately and refreshed in the
+        background, except for budgeted callers: a refresh can't be held to
+        their budget, so it waits for a lookup that needs the answer.
+        """
+        # Check the database for cached collaborations (an empty set is a valid cached result)
+        with recorder.span("db.collaborators"):
+            collaborations = self.db.get_collaborators(artist_id)
+        if collaborations is not None:
+            recorder.count("collaborations.cache.hit")
+            if budget is None and self.is_stale(artist_id):
+                self.refresh_in_background(artist_id)
+            return collaborations
+        recorder.count("collaborations.cache.miss")
+
+        if budget is None:
+            # Share the streaming crawl that move validation uses; it caches itself when complete
+            stream = self.crawl(artist_id)
+            with recorder.span("songs.crawl", artist_id=artist_id):
+                stream.wait()
+            return set(collaborator_counts(stream.songs, artist_id)[0])
+
+        # Fetch the whole discography from the Genius API, several pages at a time
+        with recorder.span("songs.crawl", artist_id=artist_id):
+            songs, stats = genius_api.fetch_artist_songs(artist_id, self.token, budget=budget)
+        return set(self._save_crawl(artist_id, songs, stats))
+
+    def crawl(self, artist_id):
+        """Return the running crawl of the artist's discography, starting one if there is none."""
+        with self.crawls_lock:
+            stream = self.crawls.get(artist_id)
+            if stream is None:
+                stream = genius_api.SongStream(
+                    artist_id, self.token, on_complete=lambda songs, stats: self._crawl_finished(artist_id, songs, stats)
+                )
+                self.crawls[artist_id] = stream
+                stream.start()
+        return stream
+
+    def _crawl_finished(self, artist_id, songs, stats):
+        try:
+            self._save_crawl(artist_id, songs, stats)
+        finally:
+            with self.crawls_lock:
+                self.crawls.pop(artist_id, None)
+
+    def _save_crawl(self, artist_id, songs, stats):
+        """Cache a finished crawl. Returns the collaborator song counts."""
+        print(f"Fetched {stats.pages} song pages for artist {artist_id} in {stats.seconds:.2f}s ({stats.pages_per_second:.1f} pages/sec)")
+        # Songs from a crawl cut short by the budget or an error are still true,
+        # but the artist's collaborator set would be partial
+        self.save_songs(songs, fetched_artist_id=artist_id if stats.complete else None)
+        return collaborator_counts(songs, artist_id)[0]
+
+    def save_songs(self, songs, fetched_artist_id=None):
+        """Cache songs and the collaborations between everyone they credit.
+
+        Edges are stored in both directions, so a featured artist whose own
+        discography was never crawled can already be matched against everyone
+        they appear with. With fetched_artist_id, songs is that artist's
+        complete discography (or everything new in it) and they are marked as
+        fetched. The CPU's and the suggestion indexes are updated too, once
+        they exist.
+        """
+        credited, names = song_credits(songs)
+        with recorder.span("db.write"):
+            new_songs = self.db.save_songs(credited, names, fetched_artist_id, newest_song_id(songs))
+        recorder.count("songs.new", len(new_songs))
+        if self.index is not None:
+            self.index.add_songs(new_songs, names)
+        if self.name_index is not None:
+            self.name_index.add(names, songs=Counter(a for _, artist_ids in new_songs for a in artist_ids))
+
+    def is_stale(self, artist_id):
+        """True if the artist's cached discography is older than COLLABORATIONS_TTL."""
+        state = self.db.fetch_state(artist_id)
+        return state is not None and time.time() - state[0] > COLLABORATIONS_TTL
+
+    def refresh_in_background(self, artist_id):
+        """Start an incremental refresh of a cached discography unless one is already running."""
+        with self.refreshes_lock:
+            if artist_id in self.refreshes:
+                return
+            thread = threading.Thread(target=self._refresh_collaborations, args=(artist_id,), name="refresh", daemon=True)
+            self.refreshes[artist_id] = thread
+        thread.start()
+
+    def refresh_collaborations_now(self, artist_id):
+        """Bring a stale discography up to date, waiting for it. Returns the collaborator set."""
+        self.refresh_in_background(artist_id)
+        with self.refreshes_lock:
+            thread = self.refreshes.get(artist_id)
+        if thread is not None:
+            thread.join()
+        return self.db.get_collaborators(artist_id)
+
+    def _refresh_collaborations(self, artist_id):
+        """Fetch only the songs released since the last crawl and merge them into the cache."""
+        with profiled(), recorder.span("songs.refresh", artist_id=artist_id):
+            self._refresh_collaborations_blocking(artist_id)
+
+    def _refresh_collaborations_blocking(self, artist_id):
+        try:
+            state = self.db.fetch_state(artist_id)
+            if state is None:
+                return
+            newest = state[1]
+            if newest is None:
+                # Cached before high-water marks were recorded; one full crawl sets it
+                songs, stats = genius_api.fetch_artist_songs(artist_id, self.token)
+                self.save_songs(songs, fetched_artist_id=artist_id if stats.complete else None)
+                return
+
+            songs, stats = genius_api.fetch_new_songs(artist_id, self.token, newest)
+            print(f"Refreshed artist {artist_id}: {len(songs)} new songs in {stats.pages} pages")
+            # Songs already stored are skipped, so new ones just add to the counts
+            self.save_songs(songs, fetched_artist_id=artist_id if stats.complete else None)
+        except Exception as e:
+            print(f"Refreshing artist {artist_id} failed: {e!r}")
+        finally:
+            with self.refreshes_lock:
+                self.refreshes.pop(artist_id, None)
+
+    def fetch_artist_data(self, artist_name, budget=None):
+        """Fetch artist data from Genius and cache it."""
+        key = normalize_artist_name(artist_name)
+        if not key:
+            return None
+        record = self.artist_cache.get(key)
+        if record is not None:
+            recorder.count("artist.cache.memory")
+            return record.to_dict()
+
+        # Names resolved in an earlier session, evicted from memory or known not to exist are answered locally
+        with recorder.span("db.alias"):
+            hit, artist_data = self.db.resolve_alias(key)
+        if hit:
+            recorder.count("artist.cache.db")
+            if artist_data:
+                self.artist_cache.put(key, ArtistRecord.from_dict(artist_data))
+            return artist_data
+
+        if budget is not None and not budget.take():
+            return None
+        recorder.count("artist.cache.miss")
+
+        response = genius_api.api_get("/search", self.token, params={"q": artist_name})
+
+        if response.status_code == 200:
+            data = response.json()
+            if data["response"]["hits"]:
+                artist = data["response"]["hits"][0]["result"]["primary_artist"]
+                record = ArtistRecord(artist["id"], artist["name"], artist.get("image_url"))
+                artist_data = record.to_dict()
+                # Cache under the typed name and the canonical Genius spelling
+                canonical_key = normalize_artist_name(artist_data["name"])
+                with recorder.span("db.write"):
+                    self.db.save_alias([key, canonical_key], artist_data)
+                if self.name_index is not None:
+                    self.name_index.add({artist_data["id"]: artist_data["name"]}, aliases=[(key, artist_data["id"])])
+                # Both keys share one record
+                self.artist_cache.put(key, record)
+                self.artist_cache.put(canonical_key, record)
+                return artist_data
+
+            # Remember that nothing matched so the same typo doesn't search again
+            with recorder.span("db.write"):
+                self.db.save_alias([key], None)
+
+        return None
+
+    def cache_stats(self):
+        """Sizes and hit rates of the in-memory caches, for the debug overlay and the server's /stats."""
+        stats = {"artists": self.artist_cache.stats()}
+        if self.name_index is not None:
+            stats["suggestions"] = {"names": len(self.name_index.keys)}
+        if self.index is not None:
+            stats["cpu_index"] = {"artists": len(self.index.adjacency)}
+        return stats
+
+    def top_collaborators(self, artist_id, limit):
+        """The artist's most frequent collaborators, for prefetching."""
+        return self.db.top_collaborators(artist_id, limit)
+
+    def has_edge(self, artist_id, other_id):
+        """True if the two artists are credited together on a song. Blocking.
+
+        Any cached song that credits both answers "yes" with one indexed
+        lookup, even if neither discography was crawled; "no" is definite once
+        either side's discography is cached. Otherwise the side that looks
+        less prolific is crawled, and the answer is "yes" as soon as any page
+        credits the other artist; the crawl then finishes and is cached in the
+        background. "No" needs the whole discography, and the other side is
+        only crawled if that crawl could not be completed.
+
+        Raises CollaborationLookupError if no complete discography could be
+        fetched or refreshed to give a definite "no".
+        """
+        if artist_id == other_id:
+            return False  # Every song credits its own artist; that isn't a feature
+        with recorder.span("db.edge"):
+            if self.db.has_edge(artist_id, other_id):
+                if not self.db.fetch_state(artist_id) and not self.db.fetch_state(other_id):
+                    recorder.count("edge.derived")  # Known from someone else's discography
+                return True
+            fetched = [a for a in (artist_id, other_id) if self.db.fetch_state(a) is not None]
+
+        if fetched:
+            stale = [a for a in fetched if self.is_stale(a)]
+            if len(stale) < len(fetched):
+                return False  # A fresh, complete discography doesn't credit the other artist
+            # A stale cache may just be missing a recent feature; catch up before calling it wrong
+            fetched_at = {a: self.db.fetch_state(a)[0] for a in stale}
+            for a in stale:
+                self.refresh_collaborations_now(a)
+            if self.db.has_edge(artist_id, other_id):
+                return True
+            # A refresh that completed records a new fetch time
+            if not any(self.db.fetch_state(a)[0] > fetched_at[a] for a in stale):
+                raise CollaborationLookupError(f"Couldn't refresh the discography of artist {stale[0]}")
+            return False
+
+        first, second = sorted((artist_id, other_id), key=self.db.known_degree)
+        for side, other in ((first, second), (second, first)):
+            stream = self.crawl(side)
+            with recorder.span("songs.scan", artist_id=side):
+                if any(credits(song, other) for songs in stream for song in songs):
+                    recorder.count("edge.early_exit")
+                    return True
+            if stream.stats.complete:
+                return False  # The whole discography was scanned, so the answer is definite
+        # Neither crawl finished; a network error is not a wrong answer
+        raise CollaborationLookupError(f"Couldn't fetch the discographies of artists {artist_id} and {other_id}")
+
+    def check_turn(self, artist_name, current_artist_id, artist_id=None):
+        """Resolve the input artist and check it against the current artist's ID. Blocking.
+
+        artist_id, if given, is the ID of a picked suggestion and skips the search.
+        Returns a dict with artist_name, artist_data and a status of
+        "not_found", "first", "valid" or "invalid". Raises
+        CollaborationLookupError if the Genius API failed before the move
+        could be judged.
+        """
+        if artist_id is not None:
+            recorder.count("artist.suggested")
+            artist_data = self.known_artist(artist_id)
+        elif self.snapshot is not None:
+            artist_data = self.snapshot.find_artist(artist_name)
+        else:
+            artist_data = self.fetch_artist_data(artist_name)
+        result = {"artist_name": artist_name, "artist_data": artist_data}
+        if not artist_data:
+            result["status"] = "not_found"
+        elif current_artist_id is None:
+            result["status"] = "first"
+        else:
+            # The offline snapshot has no network to fall back on
+            edges = self.snapshot if self.snapshot is not None else self
+            result["status"] = "valid" if edges.has_edge(current_artist_id, artist_data["id"]) else "invalid"
+        return result
+
+    def known_artist(self, artist_id):
+        """Artist data for an ID the engine has already seen, without searching; None if unknown."""
+        if self.snapshot is not None:
+            name = self.snapshot.name(artist_id)
+            return {"id": artist_id, "name": name, "image_url": None} if name is not None else None
+        name = self.name_index.name(artist_id) if self.name_index is not None else None
+        if name is None:
+            return None
+        return {"id": artist_id, "name": name, "image_url": self.db.image_url(artist_id)}
+
+    def load_name_index(self):
+        """Start loading the suggestion index in the background, once."""
+        with self.index_lock:
+            if self.name_index is None:
+                self.name_index = NameIndex()
+                self.name_index.load_in_background(self.snapshot if self.snapshot is not None else self.db)
+
+    def suggest(self, prefix, limit=SUGGESTIONS):
+        """Known artists whose names start with prefix, as (display name, artist ID) pairs.
+
+        Served from memory and fast enough to call on every keystroke; empty
+        until load_name_index() has finished.
+        """
+        if self.name_index is None:
+            return []
+        return self.name_index.suggest(prefix, limit)
+
+    def collaboration_index(self):
+        """The in-memory index the CPU opponent plays from, loading it in the background on first use."""
+        with self.index_lock:
+            if self.index is None:
+                self.index = CollaborationIndex()
+                # Offline, the snapshot is the graph moves are checked against
+                self.index.load_in_background(self.snapshot if self.snapshot is not None else self.db)
+        return self.index
+
+    def cpu_move(self, current_artist_id, used_ids):
+        """Choose the CPU's answer from cached collaborations.
+
+        Only blocks while the index is still loading, or to crawl the current
+        artist once if nothing about them is cached. Returns a result like
+        check_turn's with a status of "first", "valid" or "gave_up".
+        """
+        index = self.collaboration_index()
+        index.wait_loaded()
+        start = time.perf_counter()
+        if current_artist_id is None:
+            status = "first"
+            artist_id = index.open_round(used_ids)
+        else:
+            status = "valid"
+            artist_id = index.best_answer(current_artist_id, used_ids)
+            if artist_id is None and self.snapshot is None and self.db.fetch_state(current_artist_id) is None:
+                self.fetch_collaborations(current_artist_id)
+                artist_id = index.best_answer(current_artist_id, used_ids)
+        recorder.add_span("cpu.move", start, time.perf_counter())
+
+        if artist_id is None:
+            return {"artist_name": None, "artist_data": None, "status": "gave_up"}
+        image_url = self.db.image_url(artist_id) if self.snapshot is None else None
+        artist_data = {"id": artist_id, "name": index.names[artist_id], "image_url": image_url}
+        return {"artist_name": artist_data["name"], "artist_data": artist_data, "status": status}
+
+
+class Match:
+    """Turn and score state of one two-player game.
+
+    A move is checked with check() (blocking, may hit the network) and then
+    applied with apply(), which only updates state and so can run on a GUI or
+    event-loop thread. Callers must not apply two moves to a match at once.
+
+    Players are numbered 1 and 2. current_player is the player who named the
+    current artist; the player who makes a mistake earns a point and a new
+    round starts with the other player choosing. If cpu_player is set, that
+    player's moves come from cpu_check() instead of check().
+    """
+    def __init__(self, engine, player1_name=None, player2_name=None, starting_player=None, cpu_player=None):
+        self.engine = engine
+        self.player_names = {1: "Player 1", 2: "Player 2"}
+        self.set_player_names(player1_name, player2_name)
+        self.scores = {1: 0, 2: 0}
+        self.starting_player = starting_player or random.randint(1, 2)  # Randomly choose the starting player
+        self.current_player = self.starting_player
+        self.current_artist = None  # Genius display name of the artist to feature with
+        self.current_artist_id = None
+        self.named_ids = set()  # Genius artist IDs already used this round
+        self.rounds = 1
+        self.cpu_player = cpu_player
+
+    def set_player_names(self, player1_name, player2_name):
+        self.player_names = {1: player1_name or "Player 1", 2: player2_name or "Player 2"}
+
+    @property
+    def next_player(self):
+        """The player whose turn it is."""
+        if self.current_artist is None:
+            return self.starting_player
+        return 1 if self.current_player == 2 else 2
+
+    def check(self, artist_name, artist_id=None):
+        """Validate a move against the current artist without changing any state. Blocking.
+
+        artist_id is the ID of a picked suggestion, if any.
+        """
+        return self.engine.check_turn(artist_name, self.current_artist_id, artist_id)
+
+    @property
+    def cpu_to_move(self):
+        return self.cpu_player is not None and self.next_player == self.cpu_player
+
+    def cpu_check(self):
+        """The CPU's move for the current position, ready for apply(). Blocking, but quick."""
+        return self.engine.cpu_move(self.current_artist_id, frozenset(self.named_ids))
+
+    def apply(self, result):
+        """Apply a result from check() and return it with the outcome filled in.
+
+        The status is as returned by check() or cpu_check(), except that
+        naming an artist already used this round becomes "repeated". "player"
+        is who made the move; when the move ended the round, "point_to" is the
+        player who scored.
+        """
+        status = result["status"]
+        result["player"] = self.next_player
+        result["point_to"] = None
+        if status == "not_found":
+            return result
+
+        artist_data = result["artist_data"]
+        if status in ("valid", "invalid") and artist_data["id"] in self.named_ids:
+            status = result["status"] = "repeated"
+
+        if status in ("first", "valid"):
+            self.named_ids.add(artist_data["id"])
+            self.current_artist = artist_data["name"]
+            self.current_artist_id = artist_data["id"]
+            if status == "valid":
+                self.current_player = result["player"]
+        else:
+            self.end_round(result["player"])
+            result["point_to"] = result["player"]
+        return result
+
+    def play(self, artist_name):
+        """check() and apply() a move in one blocking call."""
+        return self.apply(self.check(artist_name))
+
+    def end_round(self, point_to):
+        """Award the mistake's point and start a new round with the other player choosing."""
+        self.scores[point_to] += 1
+        self.current_artist = None
+        self.current_artist_id = None
+        self.named_ids.clear()
+        # Alternate the starting player
+        self.starting_player = 1 if self.starting_player == 2 else 2
+        self.current_player = self.starting_player
+        self.rounds += 1
+
+    def state(self):
+        """JSON-serialisable snapshot of the match."""
+        return {
+            "players": {str(n): name for n, name in self.player_names.items()},
+            "scores": {str(n): score for n, score in self.scores.items()},
+            "round": self.rounds,
+            "next_player": self.next_player,
+            "current_artist": self.current_artist,
+            "current_artist_id": self.current_artist_id,
+            "named_artist_ids": sorted(self.named_ids),
+            "cpu_player": self.cpu_player,
+        }
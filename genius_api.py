@@ -0,0 +1,516 @@
+"""Thin client for the Genius API built on one shared, connection-pooled session.
+
+Every request goes through _request(), which applies a process-wide token
+bucket, a connect/read timeout and retries with backoff on 429, 5xx and
+connection errors (honouring Retry-After). Identical requests that are in
+flight at the same time share one network call. Song pages are reduced to
+compact Song tuples as soon as they are parsed rather than kept as JSON.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from caches import intern_name
+from instrumentation import profiled, recorder
+
+# Overridable so benchmarks can point the client at a local stub server
+API_ROOT = os.getenv("GENIUS_API_ROOT", "https://api.genius.com")
+
+# Largest page size the songs endpoint accepts
+PER_PAGE = 50
+# Number of song pages requested concurrently for one discography
+MAX_PAGE_WORKERS = int(os.getenv("GENIUS_MAX_PAGE_WORKERS", "4"))
+# Sustained requests per second to the API (0 disables the limiter) and the burst allowed on top
+RATE_LIMIT = float(os.getenv("GENIUS_RATE_LIMIT", "10"))
+RATE_BURST = int(os.getenv("GENIUS_RATE_BURST", "10"))
+# (connect, read) timeout in seconds for every request
+TIMEOUT = (float(os.getenv("GENIUS_CONNECT_TIMEOUT", "5")), float(os.getenv("GENIUS_READ_TIMEOUT", "15")))
+# Retries after the first attempt, and the longest wait between two attempts
+MAX_RETRIES = int(os.getenv("GENIUS_MAX_RETRIES", "4"))
+MAX_RETRY_DELAY = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# A song as the game keeps it: its ID and the (artist ID, interned name) pairs
+# credited on it, primary artist first and each artist once
+Song = namedtuple("Song", ["id", "artists"])
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, MAX_PAGE_WORKERS * 2))
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent.
+
+    pause() holds every caller back, e.g. for the Retry-After of a 429, which
+    applies to the whole token rather than to the one request that got it.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key wait for its result."""
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            recorder.count("api.coalesced")
+            return call.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+_bucket = TokenBucket(RATE_LIMIT, RATE_BURST)
+_flights = SingleFlight()
+_token_checks = {}  # token -> definite answer from validate_token
+
+
+def retry_after(response):
+    """Seconds asked for by a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_DELAY)
+
+
+def backoff(attempt):
+    """Exponential backoff with jitter for the given retry number (0-based)."""
+    return min(MAX_RETRY_DELAY, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def received_bytes(response):
+    """Body bytes that came over the network for a fully read response, before gzip/deflate decoding."""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return len(response.content)
+
+
+def _request(url, headers=None, params=None, rate_limited=True):
+    """GET url with timeouts and retries. Returns the last response, or raises the last connection error."""
+    for attempt in range(MAX_RETRIES + 1):
+        if rate_limited:
+            _bucket.acquire()
+        try:
+            response = get_session().get(url, headers=headers, params=params, timeout=TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+            delay = backoff(attempt)
+        else:
+            if rate_limited:
+                recorder.count("api_calls")
+            recorder.count("bytes_downloaded", received_bytes(response))
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff(attempt)
+            if response.status_code == 429:
+                recorder.count("api.throttled")
+                if rate_limited:
+                    _bucket.pause(delay)
+        recorder.count("api.retries")
+        time.sleep(delay)
+
+
+def api_get(path, token, params=None):
+    """GET an API path (e.g. "/search") with the bearer token and return the response.
+
+    Responses are shared between identical concurrent calls, so callers must not modify them.
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    endpoint = "search" if path == "/search" else "songs_page" if path.endswith("/songs") else "other"
+    key = ("api", path, token, tuple(sorted((params or {}).items())))
+    with recorder.span(f"api.{endpoint}"):
+        return _flights.do(key, lambda: _request(f"{API_ROOT}{path}", headers, params))
+
+
+def download(url):
+    """GET a non-API URL such as an artist image, with the same timeouts and retries but no rate limit."""
+    return _flights.do(("download", url), lambda: _request(url, rate_limited=False))
+
+
+def validate_token(token):
+    """True if the API accepts token. Definite answers are cached for the session.
+
+    The request also leaves a warm TLS connection in the shared session for the
+    lookups that follow. Network errors return False without being cached.
+    """
+    if not token:
+        return False
+    if token in _token_checks:
+        return _token_checks[token]
+    try:
+        response = api_get("/search", token, params={"q": "test"})
+    except requests.RequestException as e:
+        print(f"Error checking the Genius API token: {e}")
+        return False
+    if response.status_code in (200, 401, 403):
+        _token_checks[token] = response.status_code == 200
+    return response.status_code == 200
+
+
+class RequestBudget:
+    """Caps the number of API requests a background job may issue.
+
+    cancel() makes every later take() fail, so a job stops at its next request.
+    """
+    def __init__(self, max_requests=None):
+        self.max_requests = max_requests
+        self.used = 0
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Reserve one request. Returns False if the budget is spent or cancelled."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            if self.max_requests is not None and self.used >= self.max_requests:
+                return False
+            self.used += 1
+            return True
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+
+
+class FetchStats:
+    """Timing figures for one discography fetch."""
+    def __init__(self, pages, seconds, cancelled=False, failed=False):
+        self.pages = pages  # pages that returned songs
+        self.seconds = seconds
+        self.cancelled = cancelled  # True if the budget ran out before the last page
+        self.failed = failed  # True if a page errored before the last page
+
+    @property
+    def complete(self):
+        return not (self.cancelled or self.failed)
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self):
+        return f"FetchStats(pages={self.pages}, seconds={self.seconds:.2f}, pages_per_second={self.pages_per_second:.1f})"
+
+
+def _compact_object(obj):
+    """json.loads object_hook that keeps only what a Song needs of each song and artist.
+
+    Titles, URLs, artwork and stats are freed as soon as the object holding
+    them has been decoded, instead of once the whole page has.
+    """
+    if "primary_artist" in obj and "id" in obj:
+        return {"id": obj["id"], "primary_artist": obj["primary_artist"], "featured_artists": obj.get("featured_artists")}
+    if "name" in obj and "id" in obj:
+        return {"id": obj["id"], "name": obj["name"]}
+    return obj
+
+
+def decode_songs_page(content):
+    """Decode a songs endpoint body into (list of Song, next page number or None).
+
+    Unused fields are dropped while the body is parsed, so a page never
+    exists as a full object tree: decoding peaks at under half the memory of
+    response.json(), and only the song and artist IDs and artist names are
+    held once it returns. The object_hook call on every object makes it
+    10-15% slower than parsing the full tree. Songs without the expected
+    fields are skipped. Returns None if content is not a songs page.
+    """
+    try:
+        page = json.loads(content, object_hook=_compact_object)["response"]
+        entries = page["songs"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    songs = []
+    for entry in entries:
+        try:
+            primary = entry["primary_artist"]
+            artists = {primary["id"]: intern_name(primary["name"])}
+            for artist in entry.get("featured_artists") or ():
+                if artist["id"] not in artists:
+                    artists[artist["id"]] = intern_name(artist["name"])
+            songs.append(Song(entry["id"], tuple(artists.items())))
+        except (KeyError, TypeError) as e:
+            print(f"Skipping malformed song data: {e!r}")
+    return songs, page.get("next_page")
+
+
+def fetch_songs_page(artist_id, page, token, per_page=PER_PAGE, sort=None):
+    """Fetch one page of an artist's songs. Returns (list of Song, next page or None), or None on error."""
+    params = {"page": page, "per_page": per_page}
+    if sort:
+        params["sort"] = sort
+    response = api_get(f"/artists/{artist_id}/songs", token, params=params)
+
+    if response.status_code != 200:
+        print(f"Error fetching collaborations: {response.status_code} - {response.text}")
+        return None
+
+    decoded = decode_songs_page(response.content)
+    if decoded is None:
+        print("Unexpected response structure:", response.text[:200])
+    return decoded
+
+
+def fetch_artist_songs(artist_id, token, max_workers=None, per_page=PER_PAGE, budget=None, on_page=None):
+    """Fetch every song in an artist's discography as a list of Song.
+
+    Page 1 is fetched alone, so a one-page discography costs one request; only
+    if it has a next_page are up to max_workers pages kept in flight at once
+    instead of waiting for each next_page before asking for the following one.
+    Returns (songs, stats); on an error the songs from the pages before the
+    failing one are returned. If a RequestBudget runs out first,
+    stats.cancelled is set. on_page(songs) is called with each page's songs as
+    it arrives, in arrival order.
+
+    Unbudgeted crawls of the same artist running at the same time share one
+    crawl, and its songs list, so callers must not modify it.
+    """
+    if budget is not None or on_page is not None:
+        # A budgeted crawl may stop early, and a page callback is the caller's own,
+        # so neither is handed to other callers
+        return _fetch_artist_songs(artist_id, token, max_workers, per_page, budget, on_page)
+    return _flights.do(
+        ("songs", artist_id, token, per_page),
+        lambda: _fetch_artist_songs(artist_id, token, max_workers, per_page)
+    )
+
+
+def _fetch_artist_songs(artist_id, token, max_workers=None, per_page=PER_PAGE, budget=None, on_page=None):
+    max_workers = max_workers or MAX_PAGE_WORKERS
+    start = time.perf_counter()
+    pages = {}
+    last_page = None  # First page known to have no next page
+    failed_page = None  # First page that failed
+    next_page = 1
+    cancelled = False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+        while True:
+            # Most featured artists have a single page; don't speculate until page 1 says there is more
+            window = max_workers if 1 in pages else 1
+            while len(in_flight) < window and last_page is None and failed_page is None and not cancelled:
+                if budget is not None and not budget.take():
+                    cancelled = True
+                    break
+                future = executor.submit(fetch_songs_page, artist_id, next_page, token, per_page)
+                in_flight[future] = next_page
+                next_page += 1
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                page = in_flight.pop(future)
+                try:
+                    data = future.result()
+                except requests.RequestException as e:
+                    print(f"Error fetching collaborations: {e}")
+                    data = None
+
+                if data is None:
+                    failed_page = page if failed_page is None else min(failed_page, page)
+                    continue
+
+                page_songs, more = data
+                pages[page] = page_songs
+                if on_page is not None:
+                    on_page(page_songs)
+                if not more:
+                    last_page = page if last_page is None else min(last_page, page)
+
+    failed = failed_page is not None and (last_page is None or failed_page <= last_page)
+    if last_page is None and failed_page is None:
+        # Stopped by the budget; keep only the pages known to be contiguous
+        failed_page = next(page for page in range(1, next_page + 1) if page not in pages)
+
+    end_page = last_page
+    if failed_page is not None:
+        end_page = failed_page - 1 if last_page is None else min(last_page, failed_page - 1)
+    songs = []
+    for page in range(1, end_page + 1):
+        songs.extend(pages.get(page, []))
+
+    # Pages requested past the end come back empty and are not counted
+    fetched = sum(1 for page_songs in pages.values() if page_songs)
+    return songs, FetchStats(fetched, time.perf_counter() - start, cancelled and last_page is None, failed)
+
+
+class SongStream:
+    """A discography crawl running on its own thread, readable while it is in progress.
+
+    Iterating yields each page's songs as soon as it arrives (not necessarily
+    in page order), so a caller looking for one collaborator can stop at the
+    first page that credits them. The crawl carries on regardless and calls
+    on_complete(songs, stats) when it ends; songs and stats are also set on
+    the stream then. Any number of threads may iterate the same stream.
+    """
+    def __init__(self, artist_id, token, on_complete=None, max_workers=None, per_page=PER_PAGE):
+        self.artist_id = artist_id
+        self.token = token
+        self.on_complete = on_complete
+        self.max_workers = max_workers
+        self.per_page = per_page
+        self.songs = None
+        self.stats = None
+        self._pages = []
+        self._done = False
+        self._condition = threading.Condition()
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name="crawl", daemon=True)
+        thread.start()
+        return self
+
+    def _run(self):
+        songs, stats = [], FetchStats(0, 0.0, failed=True)
+        try:
+            with profiled():
+                songs, stats = _fetch_artist_songs(
+                    self.artist_id, self.token, self.max_workers, self.per_page, on_page=self._add_page
+                )
+        except Exception as e:
+            print(f"Crawling artist {self.artist_id} failed: {e!r}")
+        try:
+            if self.on_complete is not None:
+                self.on_complete(songs, stats)
+        finally:
+            with self._condition:
+                self.songs, self.stats = songs, stats
+                self._done = True
+                self._condition.notify_all()
+
+    def _add_page(self, songs):
+        with self._condition:
+            self._pages.append(songs)
+            self._condition.notify_all()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self._pages) and not self._done:
+                    self._condition.wait()
+                if index >= len(self._pages):
+                    return
+                songs = self._pages[index]
+            index += 1
+            yield songs
+
+    def wait(self, timeout=None):
+        """Block until the crawl has finished and on_complete has run. Returns stats, or None on timeout."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._done, timeout)
+            return self.stats
+
+
+def fetch_new_songs(artist_id, token, newest_song_id, per_page=PER_PAGE):
+    """Fetch the songs added since a previous crawl whose newest song id was newest_song_id.
+
+    Pages are requested with sort=release_date, which Genius lists newest
+    release first (the other sorts are "title", the default, and
+    "popularity"). Song IDs follow the order songs were added to Genius, not
+    release order, so a page can mix new and old IDs; the walk only stops at
+    a page with no ID above the high-water mark. A song added since the last
+    crawl but dated before every song on that page is still missed until the
+    artist's next full crawl. Returns (songs, stats) with only the new songs.
+    """
+    start = time.perf_counter()
+    songs = []
+    page = 1
+    fetched = 0
+    failed = False
+    while True:
+        try:
+            data = fetch_songs_page(artist_id, page, token, per_page, sort="release_date")
+        except requests.RequestException as e:
+            print(f"Error fetching collaborations: {e}")
+            data = None
+        if data is None:
+            failed = True
+            break
+
+        page_songs, more = data
+        fetched += 1 if page_songs else 0
+        new_songs = [song for song in page_songs if song.id > newest_song_id]
+        songs.extend(new_songs)
+        if not new_songs or not more:
+            break
+        page += 1
+
+    return songs, FetchStats(fetched, time.perf_counter() - start, failed=failed)
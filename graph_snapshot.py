@@ -0,0 +1,173 @@
+"""Compact, read-only collaboration graph stored in a memory-mapped file.
+
+Layout (native byte order, every section 8-byte aligned):
+
+    header      magic, version, artist/edge/alias counts, section offsets
+    ids         int64[n]      Genius artist ids, sorted; position = interned index
+    indptr      int64[n + 1]  CSR row offsets into neighbors
+    neighbors   int32[m]      interned indices, sorted within each row
+    name_ptr    int64[n + 1]  offsets into name_blob
+    name_blob   UTF-8 display names
+    alias_ptr   int64[k + 1]  offsets into alias_blob
+    alias_blob  UTF-8 normalized names, sorted
+    alias_ids   int32[k]      interned index each alias resolves to
+"""
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+
+from artist_names import normalize_artist_name
+
+MAGIC = b"RBGRAPH\0"
+VERSION = 1
+_HEADER = struct.Struct("=8sIIQQ9Q")
+_SECTIONS = ("ids", "indptr", "neighbors", "name_ptr", "name_blob", "alias_ptr", "alias_blob", "alias_ids")
+
+
+def _pad(data):
+    return data + b"\0" * (-len(data) % 8)
+
+
+def write_snapshot(path, artists, edges):
+    """Write a snapshot file.
+
+    artists maps Genius artist id to display name; edges is an iterable of
+    (artist_id, artist_id) pairs and is stored in both directions.
+    """
+    ids = sorted(artists)
+    index = {artist_id: i for i, artist_id in enumerate(ids)}
+
+    rows = [set() for _ in ids]
+    for a, b in edges:
+        if a == b or a not in index or b not in index:
+            continue
+        rows[index[a]].add(index[b])
+        rows[index[b]].add(index[a])
+
+    indptr = array("q", [0])
+    neighbors = array("i")
+    for row in rows:
+        neighbors.extend(sorted(row))
+        indptr.append(len(neighbors))
+
+    name_ptr = array("q", [0])
+    name_blob = bytearray()
+    for artist_id in ids:
+        name_blob += artists[artist_id].encode("utf-8")
+        name_ptr.append(len(name_blob))
+
+    # When two artists normalize to the same alias, the better-connected one wins
+    aliases = {}
+    for i, artist_id in enumerate(ids):
+        alias = normalize_artist_name(artists[artist_id]).encode("utf-8")
+        if alias and (alias not in aliases or len(rows[i]) > len(rows[aliases[alias]])):
+            aliases[alias] = i
+    alias_ptr = array("q", [0])
+    alias_blob = bytearray()
+    alias_ids = array("i")
+    for alias in sorted(aliases):
+        alias_blob += alias
+        alias_ptr.append(len(alias_blob))
+        alias_ids.append(aliases[alias])
+
+    sections = [
+        array("q", ids).tobytes(), indptr.tobytes(), neighbors.tobytes(), name_ptr.tobytes(),
+        bytes(name_blob), alias_ptr.tobytes(), bytes(alias_blob), alias_ids.tobytes(),
+    ]
+
+    offsets = []
+    position = _HEADER.size + (-_HEADER.size % 8)
+    for section in sections:
+        offsets.append(position)
+        position += len(_pad(section))
+    offsets.append(position)
+
+    with open(path, "wb") as f:
+        f.write(_pad(_HEADER.pack(MAGIC, VERSION, len(ids), len(neighbors), len(aliases), *offsets)))
+        for section in sections:
+            f.write(_pad(section))
+
+
+class GraphSnapshot:
+    """Memory-mapped reader for a snapshot written by write_snapshot."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, self.artist_count, self.edge_count, self.alias_count, *offsets = \
+            _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} collaboration snapshot")
+
+        section = {name: view[offsets[i]:offsets[i + 1]] for i, name in enumerate(_SECTIONS)}
+        n, m, k = self.artist_count, self.edge_count, self.alias_count
+        self._ids = section["ids"][:8 * n].cast("q")
+        self._indptr = section["indptr"][:8 * (n + 1)].cast("q")
+        self._neighbors = section["neighbors"][:4 * m].cast("i")
+        self._name_ptr = section["name_ptr"][:8 * (n + 1)].cast("q")
+        self._name_blob = section["name_blob"]
+        self._alias_ptr = section["alias_ptr"][:8 * (k + 1)].cast("q")
+        self._alias_blob = section["alias_blob"]
+        self._alias_ids = section["alias_ids"][:4 * k].cast("i")
+
+    def close(self):
+        for view in (self._ids, self._indptr, self._neighbors, self._name_ptr, self._name_blob,
+                     self._alias_ptr, self._alias_blob, self._alias_ids):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def _index(self, artist_id):
+        i = bisect_left(self._ids, artist_id)
+        if i < self.artist_count and self._ids[i] == artist_id:
+            return i
+        return None
+
+    def _alias(self, i):
+        return bytes(self._alias_blob[self._alias_ptr[i]:self._alias_ptr[i + 1]])
+
+    def name(self, artist_id):
+        """Return the display name for an artist id, or None if it isn't in the snapshot."""
+        i = self._index(artist_id)
+        if i is None:
+            return None
+        return bytes(self._name_blob[self._name_ptr[i]:self._name_ptr[i + 1]]).decode("utf-8")
+
+    def find_artist(self, artist_name):
+        """Resolve a typed name to artist data, or None if no artist normalizes to it."""
+        key = normalize_artist_name(artist_name).encode("utf-8")
+        lo, hi = 0, self.alias_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._alias(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.alias_count or self._alias(lo) != key:
+            return None
+        artist_id = self._ids[self._alias_ids[lo]]
+        return {"id": artist_id, "name": self.name(artist_id), "image_url": None}
+
+    def artist_ids(self):
+        """Return every artist id in the snapshot, in ascending order."""
+        return self._ids.tolist()
+
+    def neighbors(self, artist_id):
+        """Return the ids of an artist's collaborators."""
+        i = self._index(artist_id)
+        if i is None:
+            return []
+        return [self._ids[j] for j in self._neighbors[self._indptr[i]:self._indptr[i + 1]]]
+
+    def has_edge(self, artist_id, other_id):
+        """Return True if the two artists share a song."""
+        i = self._index(artist_id)
+        j = self._index(other_id)
+        if i is None or j is None:
+            return False
+        start, end = self._indptr[i], self._indptr[i + 1]
+        position = bisect_left(self._neighbors, j, start, end)
+        return position < end and self._neighbors[position] == j
@@ -0,0 +1,146 @@
+"""Two-tier image cache: decoded pixmaps in memory, thumbnails on disk."""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+
+from instrumentation import recorder
+
+IMAGE_CACHE_DIR = Path(os.getenv("RAPBATTLE_IMAGE_CACHE", ".cache/images"))
+# Upper bound on the decoded pixmaps kept in memory (sources and scaled variants)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("RAPBATTLE_IMAGE_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Longest side of the thumbnails written to disk; large enough for a maximized window
+THUMBNAIL_SIZE = 800
+
+
+def pixmap_bytes(pixmap):
+    """Approximate memory used by a decoded pixmap."""
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class ImageCache:
+    """LRU of decoded QPixmaps bounded by bytes, backed by a thumbnail directory.
+
+    Pixmaps are keyed by (source key, size); size None is the unscaled source.
+    Pixmap methods must be called on the GUI thread; load_thumbnail is safe to
+    run in a background worker.
+    """
+    def __init__(self, max_bytes=IMAGE_CACHE_MAX_BYTES, cache_dir=IMAGE_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pixmaps = OrderedDict()
+        self._disk_lock = threading.Lock()
+
+    def _get(self, entry):
+        pixmap = self._pixmaps.get(entry)
+        if pixmap is None:
+            self.misses += 1
+        else:
+            self._pixmaps.move_to_end(entry)
+            self.hits += 1
+        return pixmap
+
+    def _put(self, entry, pixmap):
+        old = self._pixmaps.pop(entry, None)
+        if old is not None:
+            self.total_bytes -= pixmap_bytes(old)
+        self._pixmaps[entry] = pixmap
+        self.total_bytes += pixmap_bytes(pixmap)
+        while self.total_bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self.total_bytes -= pixmap_bytes(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        """Same fields as caches.LRUCache.stats(), with the bound in bytes."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._pixmaps),
+            "max_bytes": self.max_bytes,
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def has_source(self, key):
+        return (key, None) in self._pixmaps
+
+    def put_source(self, key, pixmap):
+        """Store the unscaled pixmap for key."""
+        self._put((key, None), pixmap)
+
+    def load_file(self, path):
+        """Return the pixmap for a local file, reading it from disk only once."""
+        pixmap = self._get((path, None))
+        if pixmap is None:
+            pixmap = QPixmap(path)
+            self.put_source(path, pixmap)
+        return pixmap
+
+    def scaled(self, key, width, height):
+        """Return key's pixmap scaled to fit width x height, or None if its source isn't cached."""
+        entry = (key, (width, height))
+        pixmap = self._get(entry)
+        if pixmap is not None:
+            return pixmap
+        source = self._get((key, None))
+        if source is None:
+            return None
+        if source.isNull():
+            return source
+        with recorder.span("image.scale"):
+            pixmap = source.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self._put(entry, pixmap)
+        return pixmap
+
+    def thumbnail_path(self, url):
+        return self.cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.jpg"
+
+    def load_thumbnail(self, url):
+        """Return a QImage for url from the disk cache, downloading it on a miss. Blocking.
+
+        Returns None if the image can't be fetched or decoded.
+        """
+        path = self.thumbnail_path(url)
+        if path.exists():
+            with recorder.span("image.disk"):
+                image = QImage(str(path))
+            if not image.isNull():
+                recorder.count("image.cache.disk")
+                return image
+
+        recorder.count("image.cache.miss")
+        # Imported on first download; the menu loads this module before anything needs the network
+        import genius_api
+        with recorder.span("image.download"):
+            response = genius_api.download(url)
+        if response.status_code != 200:
+            return None
+        image = QImage()
+        with recorder.span("image.decode"):
+            if not image.loadFromData(response.content):
+                return None
+        if image.width() > THUMBNAIL_SIZE or image.height() > THUMBNAIL_SIZE:
+            image = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+        with self._disk_lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write under a temporary name so a crash never leaves a truncated thumbnail
+            partial = path.with_suffix(".part")
+            if image.save(str(partial), "JPG", 90):
+                os.replace(partial, path)
+        return image
+
+
+# Shared by the menu and the game so the logo and artist images are decoded once
+image_cache = ImageCache()
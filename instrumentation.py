@@ -0,0 +1,225 @@
+"""Per-turn latency spans, counters and opt-in session profiling.
+
+Every lookup records spans ("api.search", "songs.crawl", "db.collaborators",
+"image.scale", ...) and counters ("api_calls", "artist.cache.miss",
+"bytes_downloaded", ...) into the turn
+that is currently open. A turn stays open until the next one begins, so work
+it started in the background (image downloads, refreshes) is still
+attributed to it.
+
+Environment variables:
+    RAPBATTLE_TRACE_FILE   append each finished turn to this file as JSON lines
+    RAPBATTLE_DEBUG_OVERLAY=1  show the in-game overlay at startup (F12 toggles it)
+    RAPBATTLE_PROFILE      path prefix; profile the session with cProfile and
+                           tracemalloc and write <prefix>.prof and
+                           <prefix>.memory.txt on exit
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+TRACE_FILE = os.getenv("RAPBATTLE_TRACE_FILE")
+PROFILE_PREFIX = os.getenv("RAPBATTLE_PROFILE")
+# Finished turns kept in memory for the debug overlay
+HISTORY_SIZE = 50
+
+
+class Turn:
+    """Spans and counters recorded while one turn was open."""
+    def __init__(self, number, label):
+        self.number = number
+        self.label = label
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.spans = []
+        self.counters = Counter()
+
+    def to_dict(self):
+        return {
+            "turn": self.number,
+            "label": self.label,
+            "started": self.started,
+            "spans": self.spans,
+            "counters": dict(self.counters),
+        }
+
+    def breakdown(self):
+        """Total milliseconds spent per span name, largest first."""
+        totals = Counter()
+        for span in self.spans:
+            totals[span["name"]] += span["ms"]
+        return totals.most_common()
+
+
+class Recorder:
+    """Thread-safe collector of per-turn spans and counters."""
+    def __init__(self, trace_file=TRACE_FILE, history_size=HISTORY_SIZE):
+        self.trace_file = trace_file
+        self.history = deque(maxlen=history_size)
+        self.totals = Counter()
+        self.current = None
+        self._turns = 0
+        self._lock = threading.Lock()
+
+    def begin_turn(self, label=""):
+        """Finish the open turn and start recording a new one."""
+        with self._lock:
+            finished = self.current
+            self._turns += 1
+            self.current = Turn(self._turns, label)
+        if finished is not None:
+            self._finish(finished)
+        return self.current
+
+    def close(self):
+        """Finish the open turn, e.g. when the application exits."""
+        with self._lock:
+            finished, self.current = self.current, None
+        if finished is not None:
+            self._finish(finished)
+
+    def _finish(self, turn):
+        self.history.append(turn)
+        if self.trace_file:
+            self.export_jsonl(self.trace_file, [turn])
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the body and record it as a span of the open turn."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter(), **attributes)
+
+    def add_span(self, name, start, end, **attributes):
+        """Record a span from two time.perf_counter() readings."""
+        with self._lock:
+            turn = self.current
+            if turn is not None:
+                turn.spans.append(dict(
+                    name=name,
+                    start_ms=round((start - turn._start) * 1000, 3),
+                    ms=round((end - start) * 1000, 3),
+                    thread=threading.current_thread().name,
+                    **attributes
+                ))
+
+    def count(self, name, amount=1):
+        """Add to a counter of the open turn and to the session totals."""
+        with self._lock:
+            self.totals[name] += amount
+            if self.current is not None:
+                self.current.counters[name] += amount
+
+    def export_jsonl(self, path, turns=None):
+        """Append turns (default: the in-memory history) to path as JSON lines."""
+        turns = list(self.history) if turns is None else turns
+        with open(path, "a", encoding="utf-8") as f:
+            for turn in turns:
+                f.write(json.dumps(turn.to_dict()) + "\n")
+
+    def summary(self, turn=None):
+        """Multi-line text describing a turn (default: the open one) for the debug overlay."""
+        turn = turn or self.current
+        if turn is None:
+            return "No turns recorded yet"
+        lines = [f"Turn {turn.number}: {turn.label}"]
+        lines += [f"  {name:<16}{ms:9.1f} ms" for name, ms in turn.breakdown()]
+        lines += [f"  {name:<16}{value:>9}" for name, value in sorted(turn.counters.items())]
+        return "\n".join(lines)
+
+
+# Shared by the game, the Genius client and the image cache
+recorder = Recorder()
+
+
+class SessionProfiler:
+    """cProfile + tracemalloc capture for a whole session.
+
+    cProfile only sees the thread it is enabled in, so background work wraps
+    itself in profiled() and each thread gets its own profile; they are
+    merged when the session is written out. The profiling modules are only
+    imported once a profiler is used, keeping them out of normal startup.
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _profile(self):
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            import cProfile
+            profile = cProfile.Profile()
+            self._local.profile = profile
+        return profile
+
+    def _enable(self, profile):
+        """Enable profile and include it in the session once it has actually run."""
+        profile.enable()
+        with self._lock:
+            if profile not in self._profiles:
+                self._profiles.append(profile)
+
+    def start(self):
+        import tracemalloc
+        tracemalloc.start(25)
+        self._enable(self._profile())
+
+    @contextmanager
+    def profiled(self):
+        profile = self._profile()
+        try:
+            self._enable(profile)
+        except ValueError:
+            # Python 3.12+ allows only one active cProfile at a time
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def stop(self):
+        """Write <prefix>.prof and <prefix>.memory.txt."""
+        import pstats
+        import tracemalloc
+        self._profile().disable()
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = None
+        for profile in profiles:
+            try:
+                stats = pstats.Stats(profile) if stats is None else stats.add(profile)
+            except TypeError:
+                pass  # Nothing was recorded in that thread
+        if stats is None:
+            stats = pstats.Stats()
+        stats.dump_stats(f"{self.prefix}.prof")
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with open(f"{self.prefix}.memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"current {current / 2 ** 20:.1f} MB, peak {peak / 2 ** 20:.1f} MB\n\n")
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+        print(f"Wrote profile to {self.prefix}.prof and {self.prefix}.memory.txt")
+
+
+profiler = SessionProfiler(PROFILE_PREFIX) if PROFILE_PREFIX else None
+
+
+@contextmanager
+def profiled():
+    """Include the body in the session profile when RAPBATTLE_PROFILE is set."""
+    if profiler is None:
+        yield
+    else:
+        with profiler.profiled():
+            yield
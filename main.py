@@ -1,17 +1,22 @@
+import time
+# Taken before anything else is imported so the first-paint figure includes module loading
+STARTED = time.perf_counter()
+
 import sys
-import sqlite3
-import requests
 import os
-import random
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
-    QPushButton, QLabel, QMessageBox, QStackedWidget, QDialog
+    QPushButton, QLabel, QMessageBox, QStackedWidget, QDialog, QShortcut, QCompleter, QSizePolicy
 )
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPixmap, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, QStringListModel
 from dotenv import load_dotenv, set_key
 from pathlib import Path
 from PyQt5.QtGui import QIcon
+from workers import run_in_background
+from image_cache import image_cache
+import instrumentation
+from instrumentation import recorder
 
 # Load the .env file if it exists
 env_path = Path(".env")
@@ -20,8 +25,37 @@ load_dotenv(dotenv_path=env_path)
 # Initialize the Genius API token
 GENIUS_API_TOKEN = os.getenv("GENIUS_API_TOKEN")
 
+# Path to a snapshot written by crawler.py; when set the game runs offline against it.
+# Read here as well as in engine so the menu can decide without importing the engine.
+OFFLINE_SNAPSHOT = os.getenv("RAPBATTLE_OFFLINE_SNAPSHOT")
+
+# Quit as soon as the menu has painted; used to measure startup time
+EXIT_AFTER_FIRST_PAINT = os.getenv("RAPBATTLE_EXIT_AFTER_FIRST_PAINT") == "1"
+
+# Show the per-turn latency overlay at startup (F12 toggles it either way)
+DEBUG_OVERLAY = os.getenv("RAPBATTLE_DEBUG_OVERLAY") == "1"
+
 RAPBATTLE_LOGO = r"Assets/rapbattle_logo.jpg"
-named_artist = []
+
+# Resize events closer together than this are handled once, after the last one
+RESIZE_DEBOUNCE_MS = 80
+# Smallest side the artist image is shrunk to
+MIN_IMAGE_SIDE = 100
+
+
+def check_token(token):
+    """Load the game's network and storage modules and validate token. Blocking.
+
+    Run in the background while the menu is idle, so that by the time a game
+    starts requests and SQLite are imported and the TLS connection to the API
+    is open in the shared session. Returns None in offline mode.
+    """
+    import engine  # noqa: F401 -- only warms the import for GeniusFeatureGame
+    if OFFLINE_SNAPSHOT:
+        return None
+    import genius_api
+    return genius_api.validate_token(token)
+
 
 class GeniusFeatureGame(QWidget):
     def __init__(self, parent):
@@ -29,117 +63,47 @@ class GeniusFeatureGame(QWidget):
         self.parent = parent
         self.setWindowTitle("Genius Feature Game")
         self.setGeometry(100, 100, 400, 500)
-        self.current_artist = None
-        self.artist_cache = {}
-        self.collaborations_cache = {}
         self.pixmap = None
-        self.current_player = 1
-        self.starting_player = random.randint(1, 2) # Randomly choose the starting player
-        self.player1_name = "Player 1"
-        self.player2_name = "Player 2"
-        self.player1_score = 0  # Player 1's score
-        self.player2_score = 0  # Player 2's score
-        self.db_connection = sqlite3.connect("collaborations.db")  # SQLite database
-        self.setup_database()
+        # Imported here rather than at the top so the menu shows before requests and SQLite load
+        from engine import GameEngine, Match
+        from prefetch import Prefetcher
+        self.engine = GameEngine(GENIUS_API_TOKEN)  # Artist and collaboration caches, shared with background workers
+        self.match = Match(self.engine)  # Turn and score rules
+        self.lookup_in_flight = False  # True while a turn is being checked in the background
+        self.turn_started = 0.0  # time.perf_counter() when the current turn was submitted
+        self.image_request = 0  # Incremented for every image load so stale downloads are dropped
+        self.suggested_ids = {}  # display name -> artist ID of the suggestions on screen
+        self.image_key = None  # image_cache key of the picture on screen, rescaled when the window settles
+        self.applied_size = None  # Window size the fonts and image were last laid out for
+        self.image_side = 400  # Side of the square the image is scaled to
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self.resize_timer.timeout.connect(self.apply_size)
+        self.prefetcher = Prefetcher(self.engine.fetch_artist_data, self.engine.fetch_collaborations, self.engine.top_collaborators)
+        if self.engine.snapshot is not None:
+            self.prefetcher.max_artists = 0  # Nothing to prefetch without a network
+        self.engine.load_name_index()
         self.setup_ui()
 
-    def setup_database(self):
-        """Initialize the database and create the collaborations table if it doesn't exist."""
-        cursor = self.db_connection.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS collaborations (
-                artist_id TEXT,
-                collaborator_name TEXT
-            )
-        """)
-        self.db_connection.commit()
-
-    def fetch_collaborations(self, artist_id):
-        """Fetch all credited artists across the artist's entire discography."""
-        # Check the database for cached collaborations
-        cursor = self.db_connection.cursor()
-        cursor.execute("SELECT collaborator_name FROM collaborations WHERE artist_id = ?", (artist_id,))
-        rows = cursor.fetchall()
-
-        if rows:
-            # Return cached collaborations
-            collaborations = {row[0].lower() for row in rows}
-            return collaborations
-
-        # Fetch collaborations from the Genius API
-        collaborations = set()
-        page = 1  # Start with the first page of results
-
-        while True:
-            url = f"https://api.genius.com/artists/{artist_id}/songs?page={page}"
-            headers = {"Authorization": f"Bearer {GENIUS_API_TOKEN}"}
-            response = requests.get(url, headers=headers)
-
-            if response.status_code != 200:
-                print(f"Error fetching collaborations: {response.status_code} - {response.text}")
-                break
-
-            data = response.json()
-            if "response" not in data or "songs" not in data["response"]:
-                print("Unexpected response structure:", data)
-                break
-
-            songs = data["response"]["songs"]
-
-            for song in songs:
-                try:
-                    # Add featured artists and primary artist to collaborations
-                    for artist in song.get("featured_artists", []):
-                        collaborations.add(artist["name"].lower())
-                    collaborations.add(song["primary_artist"]["name"].lower())
-                except KeyError as e:
-                    print(f"KeyError while processing song data: {e}")
-
-            # Check if there is a next page
-            if not data["response"].get("next_page"):
-                break
-            page += 1
-
-        # Save collaborations to the database
-        for collaborator in collaborations:
-            cursor.execute("INSERT OR IGNORE INTO collaborations (artist_id, collaborator_name) VALUES (?, ?)", (artist_id, collaborator))
-        self.db_connection.commit()
-
-        return collaborations
-
-    def fetch_artist_data(self, artist_name):
-        """Fetch artist data from Genius and cache it."""
-        if artist_name.lower() in self.artist_cache:
-            return self.artist_cache[artist_name.lower()]
-
-        url = f"https://api.genius.com/search?q={artist_name}"
-        headers = {"Authorization": f"Bearer {GENIUS_API_TOKEN}"}
-        response = requests.get(url, headers=headers)
-
-        if response.status_code == 200:
-            data = response.json()
-            if data["response"]["hits"]:
-                artist = data["response"]["hits"][0]["result"]["primary_artist"]
-                artist_data = {
-                    "id": artist["id"],
-                    "name": artist["name"],
-                    "image_url": artist.get("image_url", None)  # Get the artist's image URL
-                }
-                self.artist_cache[artist_name.lower()] = artist_data
-                return artist_data
-
-        return None
-
-    def set_player_names(self, player1_name, player2_name):
-        """Set the names of Player 1 and Player 2."""
-        self.player1_name = player1_name if player1_name else "Player 1"
-        self.player2_name = player2_name if player2_name else "Player 2"
-        self.score_label.setText(f"{self.player1_name}: 0 | {self.player2_name}: 0")
-        self.label.setText(f"{self.player1_name}, choose an artist:")
+    def start_match(self, player1_name, player2_name, vs_cpu=False):
+        """Start a new match; with vs_cpu, Player 2 is the computer."""
+        from engine import Match
+        self.prefetcher.cancel()
+        self.match = Match(self.engine, player1_name, player2_name, cpu_player=2 if vs_cpu else None)
+        if vs_cpu:
+            self.engine.collaboration_index()  # Start loading the CPU's index while Player 1 types
+        self.image_request += 1
+        self.clear_image()
+        self.update_score_label()
+        self.update_prompt()
+        self.maybe_cpu_move()
 
     def closeEvent(self, event):
         """Close the database connection when the application exits."""
-        self.db_connection.close()
+        self.prefetcher.cancel()
+        recorder.close()
+        self.engine.close()
         event.accept()
 
     def setup_ui(self):
@@ -159,8 +123,11 @@ class GeniusFeatureGame(QWidget):
         self.image_label = QLabel(self)
         self.image_label.setAlignment(Qt.AlignCenter)  # Center the image
         self.image_label.setStyleSheet("border: none;")  # Remove any border
-        self.image_label.setFixedSize(400, 400)  # Set an initial size for the image
-        layout.addWidget(self.image_label, alignment=Qt.AlignCenter)
+        # The label takes the height the other widgets leave, and the image is scaled to it;
+        # it never asks for more, so the window can always shrink again
+        self.image_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.image_label.setMinimumSize(MIN_IMAGE_SIDE, MIN_IMAGE_SIDE)
+        layout.addWidget(self.image_label, 1)
 
         # Add the label below the image
         self.label = QLabel("Player 1, choose an artist:")
@@ -173,6 +140,13 @@ class GeniusFeatureGame(QWidget):
         self.input = QLineEdit()
         self.input.setFixedWidth(300)
 
+        # Suggestions from locally known artists, refilled on every keystroke
+        self.suggestions = QStringListModel(self)
+        completer = QCompleter(self.suggestions, self)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.input.setCompleter(completer)
+        self.input.textEdited.connect(self.update_suggestions)
+
         self.submit_button = QPushButton("Submit")
         self.submit_button.setFixedWidth(150)
 
@@ -184,176 +158,290 @@ class GeniusFeatureGame(QWidget):
         # Add the input and button layout to the main layout
         layout.addLayout(input_button_layout)
 
-        # Add stretch to push everything upwards if the window is resized
-        layout.addStretch(1)
+        # Per-turn latency breakdown, toggled with F12
+        self.debug_overlay = QLabel(self)
+        self.debug_overlay.setStyleSheet("font-family: monospace; background: rgba(0, 0, 0, 160); color: white; padding: 4px;")
+        self.debug_overlay.setVisible(DEBUG_OVERLAY)
+        layout.addWidget(self.debug_overlay)
+        QShortcut(QKeySequence("F12"), self, activated=self.toggle_debug_overlay)
 
         self.setLayout(layout)
         self.submit_button.clicked.connect(self.process_input)
 
+    def toggle_debug_overlay(self):
+        self.debug_overlay.setVisible(not self.debug_overlay.isVisible())
+        self.update_debug_overlay()
+        # The overlay takes its height from the image
+        self.applied_size = None
+        self.apply_size()
+
+    def update_debug_overlay(self):
+        """Show the latest turn's timing breakdown and counters, and how full the caches are."""
+        if self.debug_overlay.isVisible():
+            caches = dict(self.engine.cache_stats(), images=image_cache.stats())
+            lines = [recorder.summary()]
+            for name, stats in caches.items():
+                line = f"  {name:<16}" + " ".join(f"{key}={value}" for key, value in stats.items() if key != "hit_rate")
+                if "hit_rate" in stats:
+                    line += f" hit={stats['hit_rate']:.0%}"
+                lines.append(line)
+            self.debug_overlay.setText("\n".join(lines))
+
+    def set_busy(self, busy):
+        """Show a checking state and block further submits while a lookup is in flight."""
+        self.lookup_in_flight = busy
+        self.input.setEnabled(not busy)
+        self.submit_button.setEnabled(not busy)
+        self.submit_button.setText("Checking…" if busy else "Submit")
+        if not busy:
+            self.input.setFocus()
+
+    def update_suggestions(self, text):
+        """Show the known artists whose names start with what has been typed so far."""
+        self.suggested_ids = {}
+        for name, artist_id in self.engine.suggest(text):
+            self.suggested_ids.setdefault(name, artist_id)  # The best-known artist keeps a shared name
+        self.suggestions.setStringList(list(self.suggested_ids))
+        if self.suggested_ids:
+            self.input.completer().complete()
+
     def process_input(self):
-        artist_name = self.input.text().strip()
+        if self.lookup_in_flight:
+            return
 
-        if len(named_artist) == 0:
-            named_artist.append(artist_name)
+        artist_name = self.input.text().strip()
 
         if not artist_name:
             QMessageBox.warning(self, "Input Error", "Please enter an artist name.")
             return
 
-        artist_data = self.fetch_artist_data(artist_name)
-        if not artist_data:
+        # Keep speculative work out of the way of the real lookup
+        self.prefetcher.cancel()
+        recorder.begin_turn(f"{artist_name!r} after {self.match.current_artist!r}")
+        self.turn_started = time.perf_counter()
+        self.set_busy(True)
+        # A picked suggestion already knows its artist, so no search is needed
+        run_in_background(
+            self.match.check, artist_name, self.suggested_ids.get(artist_name),
+            on_result=self.on_turn_checked, on_error=self.on_turn_failed
+        )
+
+    def on_turn_failed(self, error):
+        """Called on the GUI thread when a background turn check raised."""
+        recorder.add_span("turn.total", self.turn_started, time.perf_counter(), status="error")
+        self.update_debug_overlay()
+        self.set_busy(False)
+        QMessageBox.warning(self, "Error", f"Failed to check the artist: {error}")
+
+    def on_turn_checked(self, result):
+        """Apply the outcome of Match.check on the GUI thread."""
+        recorder.add_span("turn.total", self.turn_started, time.perf_counter(), status=result["status"])
+        self.update_debug_overlay()
+        self.set_busy(False)
+        current_artist = self.match.current_artist
+        result = self.match.apply(result)
+        artist_name = result["artist_name"]
+        artist_data = result["artist_data"]
+        status = result["status"]
+
+        if status == "not_found":
             QMessageBox.warning(self, "Artist Not Found", f"The artist '{artist_name}' does not exist. Please try again.")
             self.input.clear()
             return
 
-        if self.current_artist is None:
+        if status == "first":
             # Update the artist's image for the first input of the round
             if artist_data["image_url"]:
                 self.update_artist_image(artist_data["image_url"])
             else:
-                self.image_label.clear()  # Clear the image if no image URL is available
-
-            self.current_artist = artist_name
-            self.label.setText(f"{self.player2_name if self.current_player == 1 else self.player1_name}, name an artist that features with {self.current_artist}:")
+                self.clear_image()  # Clear the image if no image URL is available
+
+            self.prefetcher.start(artist_data["id"])
+            self.update_prompt()
+        elif status == "valid":
+            # Show the "Correct" message and wait for the user to press "OK"
+            QMessageBox.information(self, "Correct", f"Correct! {artist_name} is a valid artist.")
+            self.setWindowTitle("Genius Feature Game")
+
+            self.update_artist_image(artist_data["image_url"])
+
+            self.prefetcher.start(artist_data["id"])
+            self.update_prompt()
+        elif status == "repeated":
+            QMessageBox.information(self, "Game Over", f"Incorrect! {artist_name} has already been named! Starting a new round!")
+            self.game_over()
         else:
-            current_artist_data = self.fetch_artist_data(self.current_artist)
-            if not current_artist_data:
-                QMessageBox.warning(self, "Error", f"Failed to fetch data for {self.current_artist}.")
-                self.reset_game()
-                return
-
-            current_artist_id = current_artist_data["id"]
-            input_artist_id = artist_data["id"]
-
-            current_artist_collaborations = self.fetch_collaborations(current_artist_id)
-            input_artist_collaborations = self.fetch_collaborations(input_artist_id)
-
-            if artist_name.lower() in current_artist_collaborations or self.current_artist.lower() in input_artist_collaborations:
-                if not artist_name.lower() in named_artist:
-                    # Show the "Correct" message and wait for the user to press "OK"
-                    QMessageBox.information(self, "Correct", f"Correct! {artist_name} is a valid artist.")
-                    self.setWindowTitle("Genius Feature Game")
-                    named_artist.append(artist_name)
-
-                    self.update_artist_image(artist_data["image_url"])
-
-                    self.current_artist = artist_name
-                    next_player = self.player1_name if self.current_player == 2 else self.player2_name
-                    self.label.setText(f"{next_player}, name an artist that features with {self.current_artist}:")
-                    self.current_player = 1 if self.current_player == 2 else 2
-                else:
-                    QMessageBox.information(self, "Game Over", f"Incorrect! {artist_name} has already been named! Starting a new round!")
-                    self.game_over()
-
-            else:
-                QMessageBox.information(self, "Game Over", f"Incorrect! {artist_name} does not feature with {self.current_artist}. Starting a new round!")
-                self.game_over()
+            QMessageBox.information(self, "Game Over", f"Incorrect! {artist_name} does not feature with {current_artist}. Starting a new round!")
+            self.game_over()
 
         self.input.clear()
-    
-    def game_over(self):
-        # Award 1 point to the player who caused the mistake
-                if self.current_player == 1:
-                    self.player2_score += 1
-                else:
-                    self.player1_score += 1
+        self.maybe_cpu_move()
+
+    def maybe_cpu_move(self):
+        """If it is the CPU's turn, pick its answer in the background."""
+        if not self.match.cpu_to_move:
+            return
+        recorder.begin_turn(f"CPU after {self.match.current_artist!r}")
+        self.turn_started = time.perf_counter()
+        self.set_busy(True)
+        self.label.setText("CPU is thinking…")
+        run_in_background(self.match.cpu_check, on_result=self.on_cpu_move, on_error=self.on_cpu_failed)
+
+    def on_cpu_failed(self, error):
+        """Called on the GUI thread when the CPU's move raised; the CPU forfeits the round."""
+        print(f"CPU move failed: {error!r}")
+        self.on_cpu_move({"artist_name": None, "artist_data": None, "status": "gave_up"})
+
+    def on_cpu_move(self, result):
+        """Apply the CPU's move on the GUI thread."""
+        recorder.add_span("turn.total", self.turn_started, time.perf_counter(), status=result["status"])
+        self.update_debug_overlay()
+        self.set_busy(False)
+        current_artist = self.match.current_artist
+        result = self.match.apply(result)
+
+        if result["status"] in ("first", "valid"):
+            artist_data = result["artist_data"]
+            self.update_artist_image(artist_data["image_url"])
+            self.prefetcher.start(artist_data["id"])
+            self.update_prompt()
+        elif current_artist is None:
+            QMessageBox.information(self, "Game Over", "The CPU couldn't think of an artist to open the round with. Starting a new round!")
+            self.game_over()
+        else:
+            QMessageBox.information(self, "Game Over", f"The CPU can't name anyone who features with {current_artist}. Starting a new round!")
+            self.game_over()
+        self.maybe_cpu_move()
 
-                pixmap = QPixmap(RAPBATTLE_LOGO)
-                self.image_label.setPixmap(
-                    pixmap.scaled(
-                        self.image_label.width(),
-                        self.image_label.height(),
-                        Qt.KeepAspectRatio,
-                        Qt.SmoothTransformation
-                    ))
+    def game_over(self):
+        """Show the logo and the updated scores once a mistake has ended the round."""
+        self.image_request += 1  # Drop any artist image that is still downloading
+        image_cache.load_file(RAPBATTLE_LOGO)
+        self.show_cached_image(RAPBATTLE_LOGO)
 
-                self.update_score_label()
-                self.reset_game()
+        self.update_score_label()
+        self.reset_game()
 
     def update_score_label(self):
         """Update the score label to display the scores for both players."""
-        self.score_label.setText(f"{self.player1_name}: {self.player1_score} | {self.player2_name}: {self.player2_score}")
+        names, scores = self.match.player_names, self.match.scores
+        self.score_label.setText(f"{names[1]}: {scores[1]} | {names[2]}: {scores[2]}")
+
+    def update_prompt(self):
+        """Tell the player whose turn it is what to name."""
+        name = self.match.player_names[self.match.next_player]
+        if self.match.current_artist is None:
+            self.label.setText(f"{name}, choose an artist:")
+        else:
+            self.label.setText(f"{name}, name an artist that features with {self.match.current_artist}:")
     
     def update_artist_image(self, image_url):
-        """Update the image label with the artist's image."""
-        try:
-            response = requests.get(image_url)
-            if response.status_code == 200:
-                pixmap = QPixmap()
-                pixmap.loadFromData(response.content)
-                self.image_label.setPixmap(
-                    pixmap.scaled(
-                        self.image_label.width(),
-                        self.image_label.height(),
-                        Qt.KeepAspectRatio,
-                        Qt.SmoothTransformation
-                    )
-                )
-            else:
-                self.image_label.clear()
-        except Exception:
-            self.image_label.clear()
+        """Show the artist's image, from the image cache if possible, otherwise once it downloads."""
+        self.image_request += 1
+        request_id = self.image_request
+        if not image_url:
+            self.clear_image()
+            return
+        if image_cache.has_source(image_url):
+            recorder.count("image.cache.memory")
+            self.show_cached_image(image_url)
+            return
+        run_in_background(
+            image_cache.load_thumbnail, image_url,
+            on_result=lambda image: self.show_artist_image(request_id, image_url, image),
+            on_error=lambda e: self.show_artist_image(request_id, image_url, None)
+        )
+
+    def show_artist_image(self, request_id, image_url, image):
+        """Cache the loaded image and show it, unless a newer image was requested."""
+        if image is not None:
+            image_cache.put_source(image_url, QPixmap.fromImage(image))
+        if request_id != self.image_request:
+            return
+        if image is None:
+            self.clear_image()
+            return
+        self.show_cached_image(image_url)
 
-    def reset_game(self):
-        self.current_artist = None
-        named_artist.clear()
+    def show_cached_image(self, key):
+        """Show a cached image scaled to the image label."""
+        pixmap = image_cache.scaled(key, self.image_side, self.image_side)
+        if pixmap is None:
+            self.clear_image()
+        else:
+            self.image_key = key
+            self.image_label.setPixmap(pixmap)
+        self.update_debug_overlay()
 
-        # Alternate the starting player
-        self.starting_player = 1 if self.starting_player == 2 else 2
-        self.current_player = self.starting_player
+    def clear_image(self):
+        self.image_key = None
+        self.image_label.clear()
 
-        starting_player_name = self.player1_name if self.starting_player == 1 else self.player2_name
-        self.label.setText(f"{starting_player_name}, choose an artist:")
+    def reset_game(self):
+        """Show the start of the new round the match moved on to."""
+        self.prefetcher.cancel()
+        self.update_prompt()
 
     def resizeEvent(self, event):
-        """Handle window resizing to adjust the image size proportionally to the window."""
-        base_font_size = max(10, self.width() // 50)
-        font = f"""
-            QLabel {{
-                font-size: {base_font_size}px;
-            }}
-            QLineEdit {{
-                font-size: {base_font_size}px;
-            }}
-            QPushButton {{
-                font-size: {base_font_size}px;
-            }}
-        """
-        self.setStyleSheet(font)
-
-        # Adjust the image label size proportionally to the window size
-        window_width = self.width()
-        window_height = self.height()
-
-        # Set the image size to be proportional to the window size 
-        image_width = int(window_width * 0.4)
-        image_height = int(window_height * 0.4)
-
-        # Apply the new size and position to the image label
-        self.image_label.setGeometry(0, 0, image_width, image_height)
-
+        """Restart the debounce timer; a drag is laid out once, when it settles."""
+        self.resize_timer.start()
         super().resizeEvent(event)
 
+    def apply_size(self):
+        """Scale the fonts and the image to the settled window size."""
+        size = (self.width(), self.height())
+        if size == self.applied_size:
+            return
+        self.applied_size = size
+
+        # A font set on the widget reaches every child without re-polishing a stylesheet
+        font_size = max(10, self.width() // 50)
+        if self.font().pixelSize() != font_size:
+            font = self.font()
+            font.setPixelSize(font_size)
+            self.setFont(font)
+
+        # Lay out with the new font now, so the label has its final size
+        self.layout().activate()
+        side = max(MIN_IMAGE_SIDE, min(self.image_label.width(), self.image_label.height()))
+        if side != self.image_side:
+            self.image_side = side
+            if self.image_key is not None:
+                # Scaled from the cached source once per settled size
+                self.show_cached_image(self.image_key)
+
 
 class MainMenu(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
+        self.painted = False
         self.setup_ui()
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            self.parent.on_first_paint()
+
     def setup_ui(self):
         layout = QVBoxLayout()
 
         # Logo
         logo_label = QLabel(self)
-        logo_pixmap = QPixmap(RAPBATTLE_LOGO) 
-        logo_label.setPixmap(logo_pixmap.scaled(400, 400, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        image_cache.load_file(RAPBATTLE_LOGO)
+        logo_label.setPixmap(image_cache.scaled(RAPBATTLE_LOGO, 400, 400))
         logo_label.setAlignment(Qt.AlignCenter)
 
         # Start Game Button
-        start_button = QPushButton("Start Game")
-        start_button.setFixedSize(200, 50)
-        start_button.clicked.connect(self.start_game)
+        self.start_button = QPushButton("Start Game")
+        self.start_button.setFixedSize(200, 50)
+        self.start_button.clicked.connect(lambda: self.start_game(vs_cpu=False))
+
+        # Single-player Button
+        self.cpu_button = QPushButton("Play vs CPU")
+        self.cpu_button.setFixedSize(200, 50)
+        self.cpu_button.clicked.connect(lambda: self.start_game(vs_cpu=True))
 
         # Instructions Button
         instructions_button = QPushButton("Instructions")
@@ -368,16 +456,45 @@ class MainMenu(QWidget):
         # Add widgets to the layout
         layout.addWidget(logo_label, alignment=Qt.AlignCenter)  # Add the logo above the buttons
         layout.addStretch(1)
-        layout.addWidget(start_button, alignment=Qt.AlignCenter)
+        layout.addWidget(self.start_button, alignment=Qt.AlignCenter)
+        layout.addWidget(self.cpu_button, alignment=Qt.AlignCenter)
         layout.addWidget(instructions_button, alignment=Qt.AlignCenter)
         layout.addWidget(quit_button, alignment=Qt.AlignCenter)
         layout.addStretch(1)
 
         self.setLayout(layout)
 
-    def start_game(self):
-        # Test the Genius API connection
-        if not self.test_genius_api_connection():
+    def start_game(self, vs_cpu):
+        # Offline mode doesn't use the API
+        if OFFLINE_SNAPSHOT:
+            self.parent.switch_to_game(vs_cpu)
+            return
+        # Usually answered from the check started at launch
+        self.check_token(retried=False, vs_cpu=vs_cpu)
+
+    def check_token(self, retried, vs_cpu):
+        """Validate the token in the background, then continue in on_token_checked."""
+        button = self.cpu_button if vs_cpu else self.start_button
+        self.start_button.setEnabled(False)
+        self.cpu_button.setEnabled(False)
+        button.setText("Connecting…")
+        run_in_background(
+            check_token, GENIUS_API_TOKEN,
+            on_result=lambda valid: self.on_token_checked(valid, retried, vs_cpu),
+            on_error=lambda e: self.on_token_checked(False, retried, vs_cpu)
+        )
+
+    def on_token_checked(self, valid, retried, vs_cpu):
+        self.start_button.setEnabled(True)
+        self.start_button.setText("Start Game")
+        self.cpu_button.setEnabled(True)
+        self.cpu_button.setText("Play vs CPU")
+        if valid:
+            # Switch to the game interface
+            self.parent.switch_to_game(vs_cpu)
+        elif retried:
+            QMessageBox.critical(self, "Error", "Failed to connect to the Genius API. Please check your token.")
+        else:
             # Prompt the user to enter their Genius API token
             token_dialog = GeniusApiTokenDialog(self)
             if token_dialog.exec_() == QDialog.Accepted:
@@ -387,24 +504,9 @@ class MainMenu(QWidget):
                     GENIUS_API_TOKEN = new_token
 
                     # Retry the connection
-                    if not self.test_genius_api_connection():
-                        QMessageBox.critical(self, "Error", "Failed to connect to the Genius API. Please check your token.")
-                        return
+                    self.check_token(retried=True, vs_cpu=vs_cpu)
                 else:
                     QMessageBox.warning(self, "Error", "No API token provided. Cannot start the game.")
-                    return
-
-        # Switch to the game interface
-        self.parent.switch_to_game()
-
-    def test_genius_api_connection(self):
-        """Test the connection to the Genius API."""
-        try:
-            headers = {"Authorization": f"Bearer {GENIUS_API_TOKEN}"}
-            response = requests.get("https://api.genius.com/search?q=test", headers=headers)
-            return response.status_code == 200
-        except Exception:
-            return False
 
     def show_instructions(self):
         # Show a pop-up dialog with instructions
@@ -415,6 +517,7 @@ class MainMenu(QWidget):
             "3. Players alternate turns until someone makes a mistake.\n"
             "4. The player who causes the mistake earns 1 point.\n"
             "5. The game resets, and the next round begins.\n\n"
+            "In Play vs CPU, the computer is Player 2 and answers from the artists cached so far.\n\n"
             "Good luck and have fun!")
 
     def quit_game(self):
@@ -423,8 +526,8 @@ class MainMenu(QWidget):
 
 
 class PlayerNameDialog(QDialog):
-    """Dialog to collect Player 1 and Player 2 names."""
-    def __init__(self, parent=None):
+    """Dialog to collect Player 1 and Player 2 names; only Player 1's against the CPU."""
+    def __init__(self, parent=None, vs_cpu=False):
         super().__init__(parent)
         self.setWindowTitle("Enter Player Names")
         self.setGeometry(100, 100, 300, 200)
@@ -440,8 +543,11 @@ class PlayerNameDialog(QDialog):
         # Input for Player 2
         self.player2_input = QLineEdit()
         self.player2_input.setPlaceholderText("Enter Player 2's name")
-        layout.addWidget(QLabel("Player 2:"))
-        layout.addWidget(self.player2_input)
+        if vs_cpu:
+            self.player2_input.setText("CPU")
+        else:
+            layout.addWidget(QLabel("Player 2:"))
+            layout.addWidget(self.player2_input)
 
         # OK Button
         ok_button = QPushButton("OK")
@@ -492,15 +598,14 @@ class MainWindow(QWidget):
 
         # Check if the Genius API token is available
         global GENIUS_API_TOKEN
-        if not GENIUS_API_TOKEN:
+        if not GENIUS_API_TOKEN and not OFFLINE_SNAPSHOT:
             self.prompt_for_api_token()
 
         self.stack = QStackedWidget()
         self.main_menu = MainMenu(self)
-        self.game = GeniusFeatureGame(self)
+        self.game = None  # Built on first use so the menu doesn't wait for the engine and database
 
         self.stack.addWidget(self.main_menu)
-        self.stack.addWidget(self.game)
 
         layout = QVBoxLayout()
         layout.addWidget(self.stack)
@@ -526,16 +631,39 @@ class MainWindow(QWidget):
                 QMessageBox.critical(self, "Error", "No API token provided. Exiting the application.")
                 sys.exit(-1)
 
-    def switch_to_game(self):
-        dialog = PlayerNameDialog(self)
+    def on_first_paint(self):
+        """Record the time to first paint, then warm up the game in the background."""
+        now = time.perf_counter()
+        recorder.add_span("startup.first_paint", STARTED, now)
+        print(f"First paint after {(now - STARTED) * 1000:.0f} ms")
+        if EXIT_AFTER_FIRST_PAINT:
+            QTimer.singleShot(0, QApplication.quit)
+            return
+        # Queued so the first frame is on screen before the imports compete for the GIL
+        QTimer.singleShot(0, lambda: run_in_background(check_token, GENIUS_API_TOKEN))
+
+    def switch_to_game(self, vs_cpu=False):
+        dialog = PlayerNameDialog(self, vs_cpu)
         if dialog.exec_() == QDialog.Accepted:
             player1_name, player2_name = dialog.get_player_names()
-            self.game.set_player_names(player1_name, player2_name)
+            if self.game is None:
+                self.game = GeniusFeatureGame(self)
+                self.stack.addWidget(self.game)
+            self.game.engine.token = GENIUS_API_TOKEN  # May have been entered in the token dialog
+            self.game.start_match(player1_name, player2_name, vs_cpu)
             self.stack.setCurrentWidget(self.game)
 
 if __name__ == "__main__":
+    # RAPBATTLE_PROFILE=<prefix> captures a cProfile/tracemalloc trace of the session
+    if instrumentation.profiler:
+        instrumentation.profiler.start()
+    recorder.begin_turn("startup")
     app = QApplication(sys.argv)
     #app.setWindowIcon(QIcon("Assets/rapbattle_icon.icns"))  
     window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    recorder.close()
+    if instrumentation.profiler:
+        instrumentation.profiler.stop()
+    sys.exit(exit_code)
@@ -0,0 +1,209 @@
+"""Prefix index of known artist names, for as-you-type suggestions."""
+import heapq
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from artist_names import normalize_artist_name
+from caches import intern_name
+from graph_snapshot import GraphSnapshot
+from instrumentation import recorder
+
+# Suggestions returned per keystroke
+SUGGESTIONS = 8
+# Most-credited artists kept in a second, smaller index for short prefixes
+POPULAR_NAMES = 5000
+# A prefix matching more names than this is answered from the popular index
+SCAN_LIMIT = 400
+# Sorts after every character a normalized name can contain
+_KEY_END = "\U0010ffff"
+
+
+def _merged(keys, ids, entries):
+    """New keys and ids lists with sorted (key, artist ID) entries inserted in order."""
+    if not entries:
+        return keys, ids
+    merged_keys, merged_ids = [], []
+    start = 0
+    for key, artist_id in entries:
+        end = bisect_left(keys, key, start)
+        merged_keys += keys[start:end]
+        merged_ids += ids[start:end]
+        merged_keys.append(key)
+        merged_ids.append(artist_id)
+        start = end
+    merged_keys += keys[start:]
+    merged_ids += ids[start:]
+    return merged_keys, merged_ids
+
+
+class NameIndex:
+    """Sorted normalized names of every known artist, searched with bisect.
+
+    Keys are normalize_artist_name() output, so "lil w" finds "Lil Wayne" and
+    typed aliases find the canonical spelling. Suggestions are ranked by how
+    many cached songs credit the artist. A prefix matching thousands
+    of names is answered from a second index of only the best-known artists,
+    so a keystroke never ranks more than SCAN_LIMIT candidates. All methods
+    are thread-safe.
+    """
+    def __init__(self):
+        self.keys = []  # normalized names, sorted
+        self.ids = []  # artist ID of each key
+        self.popular_keys = []  # the same for the POPULAR_NAMES most-credited artists
+        self.popular_ids = []
+        self.names = {}  # artist_id -> interned display name
+        self.weights = {}  # artist_id -> cached songs that credit the artist
+        self._entries = set()  # (key, artist_id) pairs already indexed
+        self._popular = set()  # artist IDs in the popular index
+        self._popular_floor = 0
+        self._pending = []  # add() calls made while loading, replayed afterwards
+        self._lock = threading.Lock()  # Held by readers and to swap in new lists
+        self._write_lock = threading.Lock()  # Serializes writers, which build the new lists unlocked
+        self._loaded = threading.Event()
+
+    def load_in_background(self, source):
+        """Load from a CollaborationDB or GraphSnapshot on a background thread."""
+        load = self.load_snapshot if isinstance(source, GraphSnapshot) else self.load
+        thread = threading.Thread(target=load, args=(source,), name="names", daemon=True)
+        thread.start()
+
+    def load(self, db):
+        """Index every named artist and resolved alias in db."""
+        start = time.perf_counter()
+        try:
+            with db.connection() as connection:
+                names = {
+                    artist_id: intern_name(name)
+                    for artist_id, name in connection.execute("SELECT artist_id, name FROM artists WHERE name IS NOT NULL")
+                }
+                weights = dict(connection.execute("SELECT artist_id, COUNT(*) FROM song_artists GROUP BY artist_id"))
+                aliases = connection.execute(
+                    "SELECT alias, artist_id FROM artist_aliases WHERE artist_id IS NOT NULL"
+                ).fetchall()
+            self._build(names, weights, aliases)
+        finally:
+            self._loaded.set()
+        recorder.add_span("names.load", start, time.perf_counter())
+
+    def load_snapshot(self, snapshot):
+        """Index every artist in the offline snapshot, weighted by degree."""
+        start = time.perf_counter()
+        try:
+            names = {}
+            weights = {}
+            for artist_id in snapshot.artist_ids():
+                names[artist_id] = intern_name(snapshot.name(artist_id))
+                weights[artist_id] = len(snapshot.neighbors(artist_id))
+            self._build(names, weights, [])
+        finally:
+            self._loaded.set()
+        recorder.add_span("names.load", start, time.perf_counter())
+
+    def _build(self, names, weights, aliases):
+        entries = {(normalize_artist_name(name), artist_id) for artist_id, name in names.items()}
+        entries.update((alias, artist_id) for alias, artist_id in aliases if artist_id in names)
+        ordered = sorted(entry for entry in entries if entry[0])
+        popular = set(heapq.nlargest(POPULAR_NAMES, weights, key=weights.__getitem__))
+        popular_ordered = [entry for entry in ordered if entry[1] in popular]
+
+        with self._write_lock:
+            with self._lock:
+                self.keys = [key for key, _ in ordered]
+                self.ids = [artist_id for _, artist_id in ordered]
+                self.popular_keys = [key for key, _ in popular_ordered]
+                self.popular_ids = [artist_id for _, artist_id in popular_ordered]
+                self.names = names
+                self.weights = weights
+            self._entries = set(ordered)
+            self._popular = popular
+            # Artists credited at least this often also belong in the popular index
+            self._popular_floor = min(map(weights.__getitem__, popular)) if len(popular) >= POPULAR_NAMES else 0
+            pending, self._pending = self._pending, None
+            for args in pending:
+                self._add(*args)
+
+    def add(self, names, aliases=(), songs=None):
+        """Index newly seen artists.
+
+        names maps artist ID to display name; aliases are (normalized name,
+        artist ID) pairs a search resolved; songs counts the newly cached
+        songs that credit each artist.
+        """
+        with self._write_lock:
+            if self._pending is not None:
+                self._pending.append((names, aliases, songs))
+            else:
+                self._add(names, aliases, songs)
+
+    def _add(self, names, aliases, songs):
+        """Merge new entries into copies of the sorted lists and swap them in. Needs _write_lock.
+
+        Only the swap holds the lock suggest() waits on, so a keystroke never
+        waits while a crawl's names are merged into hundreds of thousands.
+        """
+        self.names.update((artist_id, intern_name(name)) for artist_id, name in names.items())
+        for artist_id, count in (songs or {}).items():
+            self.weights[artist_id] = self.weights.get(artist_id, 0) + count
+        entries = {(normalize_artist_name(name), artist_id) for artist_id, name in names.items()}
+        entries.update((alias, artist_id) for alias, artist_id in aliases if artist_id in self.names)
+        entries = sorted(entry for entry in entries if entry[0] and entry not in self._entries)
+        self._entries.update(entries)
+
+        # Artists that are new or now credited often enough join the popular index,
+        # under the new entries and their display name
+        promoted = {
+            artist_id for artist_id in set(names).union(songs or ())
+            if artist_id not in self._popular and artist_id in self.names
+            and self.weights.get(artist_id, 0) >= self._popular_floor
+        }
+        self._popular |= promoted
+        popular_entries = {entry for entry in entries if entry[1] in self._popular}
+        popular_entries.update(
+            entry for entry in ((normalize_artist_name(self.names[artist_id]), artist_id) for artist_id in promoted)
+            if entry in self._entries
+        )
+        if not entries and not popular_entries:
+            return
+
+        keys, ids = _merged(self.keys, self.ids, entries)
+        popular_keys, popular_ids = _merged(self.popular_keys, self.popular_ids, sorted(popular_entries))
+        with self._lock:
+            # The old lists are freed once the lock is released
+            replaced = self.keys, self.ids, self.popular_keys, self.popular_ids
+            self.keys, self.ids = keys, ids
+            self.popular_keys, self.popular_ids = popular_keys, popular_ids
+        del replaced
+
+    def suggest(self, prefix, limit=SUGGESTIONS):
+        """Up to limit (display name, artist ID) pairs whose name starts with prefix.
+
+        An exact match comes first, then the best-known artists.
+
+        Returns nothing until the index has loaded rather than block a keystroke.
+        """
+        key = normalize_artist_name(prefix)
+        if not key or not self._loaded.is_set():
+            return []
+        with self._lock:
+            lo, hi = bisect_left(self.keys, key), bisect_left(self.keys, key + _KEY_END)
+            if hi - lo <= SCAN_LIMIT:
+                candidates = set(self.ids[lo:hi])
+            else:
+                popular_lo = bisect_left(self.popular_keys, key)
+                popular_hi = bisect_left(self.popular_keys, key + _KEY_END)
+                candidates = set(self.popular_ids[popular_lo:min(popular_hi, popular_lo + SCAN_LIMIT)])
+                if len(candidates) < limit:
+                    candidates.update(self.ids[lo:lo + SCAN_LIMIT])
+            exact = set(self.ids[lo:min(bisect_right(self.keys, key, lo, hi), lo + SCAN_LIMIT)])
+            candidates |= exact
+            weights = self.weights
+            names = self.names
+            ranked = heapq.nsmallest(
+                limit, candidates,
+                key=lambda artist_id: (artist_id not in exact, -weights.get(artist_id, 0), names[artist_id])
+            )
+            return [(names[artist_id], artist_id) for artist_id in ranked]
+
+    def name(self, artist_id):
+        return self.names.get(artist_id)
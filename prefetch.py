@@ -0,0 +1,70 @@
+"""Speculative prefetch of the artists a player is likely to name next."""
+import os
+import threading
+
+from genius_api import RequestBudget
+from instrumentation import profiled
+
+# Most collaborators warmed per turn
+PREFETCH_MAX_ARTISTS = int(os.getenv("PREFETCH_MAX_ARTISTS", "5"))
+# Most Genius requests (searches and song pages) issued per turn
+PREFETCH_MAX_REQUESTS = int(os.getenv("PREFETCH_MAX_REQUESTS", "40"))
+
+
+class Prefetcher:
+    """Warms the caches for the current artist's most frequent collaborators.
+
+    Runs on its own background thread while the next player is typing. The
+    lookup callables must accept a budget keyword and stop issuing requests
+    once budget.take() returns False.
+    """
+    def __init__(self, resolve_artist, fetch_collaborations, ranked_collaborators,
+                 max_artists=PREFETCH_MAX_ARTISTS, max_requests=PREFETCH_MAX_REQUESTS):
+        self.resolve_artist = resolve_artist
+        self.fetch_collaborations = fetch_collaborations
+        self.ranked_collaborators = ranked_collaborators
+        self.max_artists = max_artists
+        self.max_requests = max_requests
+        self._budget = None
+        self._thread = None
+
+    def start(self, artist_id):
+        """Cancel any running prefetch and start warming around artist_id."""
+        self.cancel()
+        if self.max_artists <= 0 or self.max_requests <= 0:
+            return
+        self._budget = RequestBudget(self.max_requests)
+        self._thread = threading.Thread(target=self._run, args=(artist_id, self._budget), name="prefetch", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop the running prefetch before its next request."""
+        if self._budget is not None:
+            self._budget.cancel()
+            self._budget = None
+
+    def wait(self):
+        """Block until the last prefetch started has stopped."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, artist_id, budget):
+        with profiled():
+            self._prefetch(artist_id, budget)
+
+    def _prefetch(self, artist_id, budget):
+        try:
+            # The current artist's own discography is what the next answer is checked against
+            self.fetch_collaborations(artist_id, budget=budget)
+
+            warmed = 0
+            for name in self.ranked_collaborators(artist_id, self.max_artists * 2):
+                if budget.cancelled or warmed >= self.max_artists:
+                    break
+                artist_data = self.resolve_artist(name, budget=budget)
+                if not artist_data or artist_data["id"] == artist_id:
+                    continue
+                self.fetch_collaborations(artist_data["id"], budget=budget)
+                warmed += 1
+        except Exception as e:
+            print(f"Prefetch failed: {e!r}")
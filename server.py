@@ -0,0 +1,243 @@
+"""Match server: hosts many concurrent games over a small JSON/HTTP API.
+
+Every match shares one GameEngine, so an artist or discography looked up in
+one game is cached for all of them. Lookups block, so they run on a thread
+pool; the event loop only parses requests and applies results.
+
+    python server.py --port 8765
+
+    POST   /matches                {"players": ["Ana", "Ben"]}  -> new match
+    POST   /matches                {"players": ["Ana"], "cpu": true}  -> new match against the CPU
+    GET    /matches/<id>                                         -> match state
+    POST   /matches/<id>/moves     {"artist": "Drake"}           -> move result
+    DELETE /matches/<id>                                         -> end the match
+    GET    /stats                                                -> server counters
+
+A move that couldn't be checked because the Genius API failed is answered
+with 503 and leaves the match unchanged, so it can be sent again.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from engine import CollaborationLookupError, GameEngine, Match
+from instrumentation import recorder
+
+# Lookups (searches, crawls) that may run at the same time across all matches
+SERVER_WORKERS = int(os.getenv("RAPBATTLE_SERVER_WORKERS", "32"))
+# Matches without a request for this long are dropped
+MATCH_IDLE_TIMEOUT = 2 * 60 * 60
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServerMatch:
+    """A Match plus what the server needs to host it."""
+    def __init__(self, match):
+        self.match = match
+        self.lock = asyncio.Lock()  # One move at a time per match
+        self.last_seen = time.monotonic()
+        self.moves = 0
+
+
+class MatchServer:
+    def __init__(self, engine, workers=SERVER_WORKERS, idle_timeout=MATCH_IDLE_TIMEOUT):
+        self.engine = engine
+        self.idle_timeout = idle_timeout
+        self.matches = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lookup")
+        self.requests = 0
+        self.started = time.monotonic()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        sweeper = asyncio.create_task(self.expire_idle_matches())
+        print(f"Serving matches on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def expire_idle_matches(self):
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.monotonic() - self.idle_timeout
+            for match_id in [m for m, hosted in self.matches.items() if hosted.last_seen < cutoff]:
+                del self.matches[match_id]
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", "0"))
+                if length > MAX_BODY_BYTES:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method, urlsplit(target).path, body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+
+                data = json.dumps(payload).encode("utf-8")
+                head = (
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    + ("" if keep_alive else "Connection: close\r\n")
+                    + "\r\n"
+                )
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        """Route one request. Returns (HTTPStatus, JSON-serialisable payload)."""
+        self.requests += 1
+        parts = [part for part in path.split("/") if part]
+        try:
+            if parts == ["matches"] and method == "POST":
+                return HTTPStatus.CREATED, self.create_match(self.parse_body(body))
+            if parts == ["stats"] and method == "GET":
+                return HTTPStatus.OK, self.stats()
+            if len(parts) >= 2 and parts[0] == "matches":
+                hosted = self.matches.get(parts[1])
+                if hosted is None:
+                    raise HTTPError(HTTPStatus.NOT_FOUND, "no such match")
+                hosted.last_seen = time.monotonic()
+                if len(parts) == 2 and method == "GET":
+                    return HTTPStatus.OK, self.describe(parts[1], hosted)
+                if len(parts) == 2 and method == "DELETE":
+                    del self.matches[parts[1]]
+                    return HTTPStatus.OK, self.describe(parts[1], hosted)
+                if parts[2:] == ["moves"] and method == "POST":
+                    return HTTPStatus.OK, await self.play(parts[1], hosted, self.parse_body(body))
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {method} {path}")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            print(f"Request {method} {path} failed: {e!r}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"}
+
+    @staticmethod
+    def parse_body(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        return data
+
+    def create_match(self, data):
+        players = data.get("players") or []
+        if not isinstance(players, list) or len(players) > 2:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "players must be a list of at most two names")
+        players = [str(name) for name in players] + [None] * (2 - len(players))
+        if data.get("cpu"):
+            # The CPU is Player 2 and the human opens, so a new match never waits on the index
+            match = Match(self.engine, players[0], "CPU", starting_player=1, cpu_player=2)
+            self.engine.collaboration_index()
+        else:
+            match = Match(self.engine, *players)
+        match_id = uuid.uuid4().hex
+        hosted = ServerMatch(match)
+        self.matches[match_id] = hosted
+        return self.describe(match_id, hosted)
+
+    async def play(self, match_id, hosted, data):
+        artist_name = str(data.get("artist", "")).strip()
+        if not artist_name:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "artist is required")
+        async with hosted.lock:
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self.executor, hosted.match.check, artist_name)
+            except CollaborationLookupError as e:
+                # Genius failed, not the player; the move can be sent again
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            result = hosted.match.apply(result)
+            hosted.moves += 1
+            # Answer for the CPU straight away; it also opens the rounds it starts
+            cpu_results = []
+            while hosted.match.cpu_to_move:
+                cpu_result = await loop.run_in_executor(self.executor, hosted.match.cpu_check)
+                cpu_results.append(hosted.match.apply(cpu_result))
+                hosted.moves += 1
+        payload = {"result": result, "match": self.describe(match_id, hosted)}
+        if hosted.match.cpu_player is not None:
+            payload["cpu_results"] = cpu_results
+        return payload
+
+    @staticmethod
+    def describe(match_id, hosted):
+        return dict(hosted.match.state(), id=match_id, moves=hosted.moves)
+
+    def stats(self):
+        return {
+            "matches": len(self.matches),
+            "requests": self.requests,
+            "uptime_seconds": round(time.monotonic() - self.started, 1),
+            "counters": dict(recorder.totals),
+            "caches": self.engine.cache_stats(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many Rap Battle matches over a JSON/HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="concurrent lookups across all matches")
+    args = parser.parse_args(argv)
+
+    load_dotenv(dotenv_path=Path(".env"))
+    engine = GameEngine(os.getenv("GENIUS_API_TOKEN"))
+    if engine.token is None and engine.snapshot is None:
+        print("GENIUS_API_TOKEN is not set; add it to .env or set RAPBATTLE_OFFLINE_SNAPSHOT.")
+        return 1
+
+    server = MatchServer(engine, workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Shared fixtures: a local stub Genius server, a game engine and a scratch working directory."""
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import genius_api
+from bench.stub_genius import StubGenius
+from engine import GameEngine
+
+
+def fixture(songs):
+    """A stub fixture from (song ID, [credited artist IDs, primary first][, release date]) tuples.
+
+    Artist N is named "Artist N".
+    """
+    artist_ids = {artist_id for _, credited, *_ in songs for artist_id in credited}
+    artists = {artist_id: f"Artist {artist_id}" for artist_id in artist_ids}
+    return {
+        "artists": artists,
+        "songs": [
+            {
+                "id": song_id,
+                "title": f"Song {song_id:04d}",
+                "release_date": released[0] if released else None,
+                "primary_artist": {"id": credited[0], "name": artists[credited[0]]},
+                "featured_artists": [{"id": a, "name": artists[a]} for a in credited[1:]],
+            }
+            for song_id, credited, *released in songs
+        ],
+    }
+
+
+class StubTestCase(unittest.TestCase):
+    """Runs each test against its own stub server, from a temporary directory.
+
+    The Genius client is pointed at the stub without a rate limit, and gives
+    up after one retry so failure paths stay fast.
+    """
+    SONGS = []
+
+    def setUp(self):
+        self.stub = StubGenius(fixture(self.SONGS)).start()
+        self.addCleanup(self.stub.stop)
+        for name, value in (
+            ("API_ROOT", self.stub.url),
+            ("MAX_RETRIES", 1),
+            ("_bucket", genius_api.TokenBucket(0, 1)),
+        ):
+            patcher = mock.patch.object(genius_api, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        workdir = tempfile.TemporaryDirectory(prefix="rapbattle-test-")
+        self.addCleanup(workdir.cleanup)
+        self.workdir = workdir.name
+        self.db_path = os.path.join(self.workdir, "collaborations.db")
+
+
+class EngineTestCase(StubTestCase):
+    """A StubTestCase with a GameEngine on a fresh database, as self.engine."""
+    # Artists 1 and 2 feature together, as do 1 and 4; artist 3 only records alone
+    SONGS = [
+        (1, [1, 2]),
+        (2, [3]),
+        (3, [4, 1]),
+        (4, [1]),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        # Crawls and failed requests are logged, also from background threads
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connections = track_connections(self)
+        self.engine = GameEngine("token", db_path=self.db_path, snapshot_path=None)
+        self.addCleanup(self.engine.close)
+        self.addCleanup(self.engine.wait_for_crawls)
+
+
+def track_connections(test):
+    """The set of SQLite connections opened and not yet closed for the rest of the test."""
+    live = set()
+    connect = sqlite3.connect
+
+    class Connection(sqlite3.Connection):
+        def close(self):
+            live.discard(self)
+            super().close()
+
+    def tracked_connect(*args, **kwargs):
+        connection = connect(*args, factory=Connection, **kwargs)
+        live.add(connection)
+        return connection
+
+    patcher = mock.patch.object(sqlite3, "connect", tracked_connect)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return live
@@ -0,0 +1,27 @@
+import unittest
+
+from artist_names import normalize_artist_name
+
+
+class NormalizeArtistNameTest(unittest.TestCase):
+    def test_spelling_variants_share_a_key(self):
+        for name in ("Jay-Z", "JAY Z", "jay z", "Jay‐Z"):
+            self.assertEqual(normalize_artist_name(name), "jayz")
+        self.assertEqual(normalize_artist_name("A$AP Rocky"), "asaprocky")
+        self.assertEqual(normalize_artist_name("Beyoncé"), "beyonce")
+        self.assertEqual(normalize_artist_name("Drake ft. Future"), normalize_artist_name("drake featuring future"))
+        self.assertEqual(normalize_artist_name("Simon & Garfunkel"), normalize_artist_name("Simon and Garfunkel"))
+
+    def test_keeps_letters_of_every_script(self):
+        self.assertEqual(normalize_artist_name("MØ"), "mø")
+        self.assertEqual(normalize_artist_name("Моргенштерн"), "моргенштерн")
+        self.assertEqual(normalize_artist_name("宇多田ヒカル"), "宇多田ヒカル")
+        self.assertNotEqual(normalize_artist_name("MØ"), normalize_artist_name("M"))
+
+    def test_names_without_letters_keep_a_key(self):
+        self.assertEqual(normalize_artist_name("!!!"), "!!!")
+        self.assertEqual(normalize_artist_name("   "), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import sys
+import unittest
+
+from caches import ArtistRecord, LRUCache, intern_name
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # "b" is now the oldest
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_replacing_a_key_does_not_evict(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.put("a", 10)
+        self.assertEqual(cache.get("a"), 10)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.evictions, 0)
+
+    def test_stats(self):
+        cache = LRUCache(2)
+        cache.put("a", "x" * 100)
+        cache.put("b", "y")
+        cache.put("c", "z")
+        cache.get("b")
+        cache.get("c")
+        cache.get("a", "default")
+        stats = cache.stats()
+        self.assertEqual(
+            {key: stats[key] for key in ("entries", "max_entries", "hits", "misses", "evictions")},
+            {"entries": 2, "max_entries": 2, "hits": 2, "misses": 1, "evictions": 1},
+        )
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+        # The evicted entry's bytes are no longer counted
+        self.assertEqual(stats["bytes"], sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in (("b", "y"), ("c", "z"))))
+
+    def test_empty_stats(self):
+        self.assertEqual(LRUCache(1).stats()["hit_rate"], 0.0)
+
+
+class ArtistRecordTest(unittest.TestCase):
+    def test_round_trip_shares_names(self):
+        name = "".join(["Kendrick", " Lamar"])  # Built at run time, so not interned already
+        record = ArtistRecord.from_dict({"id": 1, "name": name})
+        self.assertEqual(record.to_dict(), {"id": 1, "name": "Kendrick Lamar", "image_url": None})
+        self.assertIs(record.name, intern_name("Kendrick Lamar"))
+        self.assertIsNone(intern_name(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
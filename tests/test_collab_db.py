@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import collab_db
+from collab_db import CollaborationDB
+from tests.support import track_connections
+
+
+class CollabDBTestCase(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory(prefix="rapbattle-test-")
+        self.addCleanup(workdir.cleanup)
+        self.path = os.path.join(workdir.name, "collaborations.db")
+
+    def open(self):
+        db = CollaborationDB(self.path)
+        self.addCleanup(db.close)
+        return db
+
+
+class MigrationTest(CollabDBTestCase):
+    def test_legacy_database_reaches_current_schema(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE collaborations (artist_id TEXT, collaborator_name TEXT)")
+        connection.executemany("INSERT INTO collaborations VALUES (?, ?)", [("1", "Artist 2"), ("1", "Artist 3")])
+        connection.commit()
+        connection.close()
+
+        db = self.open()
+        with db.connection() as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], collab_db.SCHEMA_VERSION)
+        # Name-keyed collaborations can't be trusted, so the artist is crawled again
+        self.assertIsNone(db.fetch_state(1))
+        self.assertIsNone(db.get_collaborators(1))
+        db.save_songs([(10, (1, 2))], fetched_artist_id=1, newest_song_id=10)
+        self.assertEqual(db.get_collaborators(1), {2})
+
+    def test_v7_forgets_aliases_of_non_latin_names(self):
+        with mock.patch.object(collab_db, "SCHEMA_VERSION", 6):
+            db = CollaborationDB(self.path)
+            db.save_alias(["m"], {"id": 1, "name": "MØ", "image_url": None})
+            db.save_alias(["drake"], {"id": 2, "name": "Drake", "image_url": None})
+            db.save_alias(["nobody"], None)
+            db.close()
+
+        db = self.open()
+        self.assertEqual(db.resolve_alias("m"), (False, None))
+        self.assertEqual(db.resolve_alias("drake"), (True, {"id": 2, "name": "Drake", "image_url": None}))
+        self.assertEqual(db.resolve_alias("nobody"), (True, None))
+
+    def test_v8_drops_the_reverse_index_and_collaborator_count(self):
+        with mock.patch.object(collab_db, "SCHEMA_VERSION", 7):
+            CollaborationDB(self.path).close()
+
+        db = self.open()
+        with db.connection() as connection:
+            indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(artists)")}
+        self.assertNotIn("idx_collaborations_collaborator", indexes)
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            self.assertNotIn("collaborator_count", columns)
+
+    def test_reopening_is_a_no_op(self):
+        db = self.open()
+        db.save_songs([(10, (1, 2))], fetched_artist_id=1)
+        db.close()
+        self.assertEqual(self.open().get_collaborators(1), {2})
+
+
+class SaveSongsTest(CollabDBTestCase):
+    def test_edges_go_both_ways_and_songs_count_once(self):
+        db = self.open()
+        new = db.save_songs([(10, (1, 2, 3)), (11, (2, 1))], names={1: "One", 2: "Two"}, fetched_artist_id=1)
+        self.assertEqual([song_id for song_id, _ in new], [10, 11])
+        # Crawled again from artist 2's discography
+        new = db.save_songs([(11, (2, 1)), (12, (2, 4))], fetched_artist_id=2, newest_song_id=12)
+        self.assertEqual([song_id for song_id, _ in new], [12])
+
+        self.assertTrue(db.has_edge(3, 2))
+        self.assertFalse(db.has_edge(3, 4))
+        self.assertEqual(db.get_collaborators(2), {1, 3, 4})
+        self.assertIsNone(db.get_collaborators(3))  # Known from others' songs, never crawled
+        self.assertEqual(db.known_degree(3), 2)
+        self.assertEqual(db.top_collaborators(1, 1), ["Two"])
+        self.assertEqual(db.fetch_state(2)[1], 12)
+
+    def test_fetched_artist_without_features_has_no_collaborators(self):
+        db = self.open()
+        db.save_songs([(10, (1,))], fetched_artist_id=1, newest_song_id=10)
+        self.assertEqual(db.get_collaborators(1), set())
+
+
+class ConnectionPoolTest(CollabDBTestCase):
+    def test_short_lived_threads_leave_no_connections(self):
+        connections = track_connections(self)
+        db = self.open()
+
+        def lookup(artist_id):
+            db.save_songs([(artist_id, (artist_id, artist_id + 1))], fetched_artist_id=artist_id)
+            db.has_edge(artist_id, artist_id + 1)
+
+        for batch in range(20):
+            threads = [threading.Thread(target=lookup, args=(batch * 10 + i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertLessEqual(len(connections), collab_db.DB_POOL_SIZE)
+        db.close()
+        self.assertEqual(len(connections), 0)
+
+    def test_failed_transaction_is_rolled_back(self):
+        db = self.open()
+        with self.assertRaises(TypeError):
+            db.save_songs([(10, (1, 2)), (11, None)])
+        self.assertFalse(db.has_edge(1, 2))
+        db.save_songs([(10, (1, 2))])
+        self.assertTrue(db.has_edge(1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
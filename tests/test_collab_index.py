@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from collab_index import OPENING_CHOICES, CollaborationIndex
+
+
+class Choices:
+    """Stands in for random: remembers what the index chose from."""
+    def choice(self, seq):
+        self.seq = list(seq)
+        return self.seq[0]
+
+
+def random_index(rng, artists=300, songs=1500):
+    """An index over songs crediting a few artists each, drawn so some artists are hubs."""
+    index = CollaborationIndex()
+    weights = [1 / (artist_id + 1) for artist_id in range(artists)]
+    credited = [
+        (song_id, list(dict.fromkeys(rng.choices(range(artists), weights, k=rng.randint(2, 4)))))
+        for song_id in range(songs)
+    ]
+    # Leave a few artists without a name; the CPU can't say those
+    names = {artist_id: f"Artist {artist_id}" for artist_id in range(artists) if artist_id % 17}
+    index.add_songs(credited, names)
+    return index
+
+
+def best_answers(index, current_id, used_ids):
+    """Every answer best_answer() may return, by scoring each candidate in full."""
+    options = {
+        candidate: index.degree(candidate) - len(index.adjacency[candidate] & set(used_ids))
+        for candidate in index.adjacency.get(current_id, ())
+        if candidate not in used_ids and candidate in index.names
+    }
+    fewest = min(options.values(), default=None)
+    return {candidate for candidate, count in options.items() if count == fewest}
+
+
+class BestAnswerTest(unittest.TestCase):
+    def test_matches_scoring_every_candidate(self):
+        rng = random.Random(1)
+        index = random_index(rng)
+        artists = sorted(index.adjacency)
+        for position in range(600):
+            if position % 100 == 99:
+                # New songs add collaborators after the orders were cached
+                index.add_songs([(10000 + position, rng.sample(artists, 3))])
+            current_id = rng.choice(artists)
+            used_ids = frozenset(rng.sample(artists, rng.randint(0, 30))) - {current_id}
+            expected = best_answers(index, current_id, used_ids)
+            choices = Choices()
+            answer = index.best_answer(current_id, used_ids, rng=choices)
+            if not expected:
+                self.assertIsNone(answer)
+            else:
+                self.assertEqual(set(choices.seq), expected, (current_id, sorted(used_ids)))
+
+    def test_unknown_artist_has_no_answer(self):
+        self.assertIsNone(random_index(random.Random(1)).best_answer(10 ** 6, frozenset()))
+
+
+class OpenRoundTest(unittest.TestCase):
+    def test_picks_among_the_best_connected_unused_artists(self):
+        rng = random.Random(2)
+        index = random_index(rng)
+        for used_count in (0, 5, 40, 250):
+            used_ids = frozenset(rng.sample(sorted(index.adjacency), used_count))
+            eligible = sorted(
+                (artist_id for artist_id in index.adjacency if artist_id in index.names and artist_id not in used_ids),
+                key=index.degree, reverse=True
+            )
+            choices = Choices()
+            index.open_round(used_ids, rng=choices)
+            self.assertEqual(len(choices.seq), min(OPENING_CHOICES, len(eligible)))
+            self.assertTrue(set(choices.seq) <= set(eligible))
+            if len(eligible) > OPENING_CHOICES:
+                self.assertGreaterEqual(min(map(index.degree, choices.seq)), index.degree(eligible[OPENING_CHOICES]))
+
+    def test_empty_index_has_no_opening(self):
+        self.assertIsNone(CollaborationIndex().open_round())
+
+
+if __name__ == "__main__":
+    unittest.main()
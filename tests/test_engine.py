@@ -0,0 +1,175 @@
+import asyncio
+import json
+import unittest
+from http import HTTPStatus
+from unittest import mock
+
+import collab_db
+import engine
+from engine import CollaborationLookupError, Match
+from server import MatchServer
+from tests.support import EngineTestCase
+
+
+class ConnectionsTest(EngineTestCase):
+    # Artist n features artist n + 100 on two pages of songs
+    SONGS = [(n * 1000 + i, [n, n + 100] if i == 0 else [n]) for n in range(1, 61) for i in range(60)]
+
+    def test_connections_stay_flat_across_crawls(self):
+        for n in range(1, 61):
+            # Answered from the first page; the crawl finishes on its own thread
+            self.assertTrue(self.engine.has_edge(n, n + 100))
+            self.assertFalse(self.engine.has_edge(n + 100, n + 1))
+        self.engine.wait_for_crawls()
+        self.assertLessEqual(len(self.connections), collab_db.DB_POOL_SIZE)
+
+
+class HasEdgeTest(EngineTestCase):
+    def test_features(self):
+        self.assertTrue(self.engine.has_edge(1, 2))
+        self.assertTrue(self.engine.has_edge(4, 1))
+
+    def test_no_feature(self):
+        self.assertFalse(self.engine.has_edge(1, 3))
+        self.assertFalse(self.engine.has_edge(2, 4))
+
+    def test_an_artist_does_not_feature_with_themselves(self):
+        self.assertFalse(self.engine.has_edge(1, 1))
+
+    def test_cached_answer_needs_no_requests(self):
+        self.assertFalse(self.engine.has_edge(1, 3))
+        self.engine.wait_for_crawls()
+        self.stub.reset_counters()
+        self.assertFalse(self.engine.has_edge(3, 1))
+        self.assertTrue(self.engine.has_edge(2, 1))
+        self.assertEqual(self.stub.counters["songs"], 0)
+
+    def test_failed_crawl_raises(self):
+        self.stub.rate_429 = 1.0
+        with self.assertRaises(CollaborationLookupError):
+            self.engine.has_edge(1, 3)
+
+    def test_failed_refresh_raises(self):
+        self.assertFalse(self.engine.has_edge(1, 3))
+        self.engine.wait_for_crawls()
+        with mock.patch.object(engine, "COLLABORATIONS_TTL", -1):
+            self.stub.rate_429 = 1.0
+            with self.assertRaises(CollaborationLookupError):
+                self.engine.has_edge(1, 3)
+            self.stub.rate_429 = 0.0
+            self.assertFalse(self.engine.has_edge(1, 3))
+
+
+class StreamingTest(EngineTestCase):
+    # Three pages; artist 2 features on the first, artist 3 on the last
+    SONGS = [(song_id, [1, {1: 2, 120: 3}[song_id]] if song_id in (1, 120) else [1]) for song_id in range(1, 121)]
+
+    def test_answers_from_the_first_page_and_caches_the_rest(self):
+        self.stub.latency = 0.2
+        self.assertTrue(self.engine.has_edge(1, 2))
+        self.assertIn(1, self.engine.crawls)  # Still crawling pages 2 and 3
+        self.assertIsNone(self.engine.db.fetch_state(1))
+
+        self.engine.wait_for_crawls()
+        self.assertEqual(self.engine.db.get_collaborators(1), {2, 3})
+        self.stub.reset_counters()
+        self.assertTrue(self.engine.has_edge(3, 1))
+        self.assertFalse(self.engine.has_edge(1, 4))
+        self.assertEqual(self.stub.counters["songs"], 0)
+
+
+class MatchTest(EngineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.match = Match(self.engine, "Ann", "Bob", starting_player=1)
+
+    def test_scoring(self):
+        self.assertEqual(self.match.play("Artist 1")["status"], "first")
+        self.assertEqual(self.match.next_player, 2)
+        result = self.match.play("Artist 2")
+        self.assertEqual((result["status"], result["player"], result["point_to"]), ("valid", 2, None))
+        self.assertEqual(self.match.current_artist_id, 2)
+
+        result = self.match.play("Artist 3")
+        self.assertEqual((result["status"], result["player"], result["point_to"]), ("invalid", 1, 1))
+        state = self.match.state()
+        self.assertEqual(state["scores"], {"1": 1, "2": 0})
+        self.assertEqual(state["round"], 2)
+        self.assertEqual(state["next_player"], 2)
+        self.assertIsNone(state["current_artist_id"])
+        self.assertEqual(state["named_artist_ids"], [])
+
+    def test_repeated_artist(self):
+        self.match.play("Artist 1")
+        self.match.play("Artist 2")
+        result = self.match.play("Artist 1")
+        self.assertEqual((result["status"], result["point_to"]), ("repeated", 1))
+
+    def test_unknown_artist_changes_nothing(self):
+        self.match.play("Artist 1")
+        before = self.match.state()
+        result = self.match.play("Nobody At All")
+        self.assertEqual((result["status"], result["point_to"]), ("not_found", None))
+        self.assertEqual(self.match.state(), before)
+
+    def test_lookup_failure_is_not_a_mistake(self):
+        self.match.play("Artist 1")
+        self.engine.fetch_artist_data("Artist 3")  # Known before Genius starts failing
+        before = self.match.state()
+        self.stub.rate_429 = 1.0
+        with self.assertRaises(CollaborationLookupError):
+            self.match.check("Artist 3")
+        self.assertEqual(self.match.state(), before)
+
+        self.stub.rate_429 = 0.0
+        self.assertEqual(self.match.play("Artist 3")["status"], "invalid")
+
+
+class ServerTest(EngineTestCase):
+    def server(self):
+        server = MatchServer(self.engine, workers=1)
+        self.addCleanup(server.executor.shutdown)
+        return server
+
+    def test_play_a_match(self):
+        server = self.server()
+
+        async def play():
+            status, match = await server.dispatch("POST", "/matches", b'{"players": ["Ann", "Bob"]}')
+            self.assertEqual(status, HTTPStatus.CREATED)
+            moves = f"/matches/{match['id']}/moves"
+            for artist, outcome in (("Artist 1", "first"), ("Artist 4", "valid"), ("Artist 3", "invalid")):
+                status, payload = await server.dispatch("POST", moves, json.dumps({"artist": artist}).encode())
+                self.assertEqual((status, payload["result"]["status"]), (HTTPStatus.OK, outcome))
+            self.assertEqual(payload["match"]["round"], 2)
+            self.assertEqual(sum(payload["match"]["scores"].values()), 1)
+            status, _ = await server.dispatch("POST", moves, b'{"artist": ""}')
+            self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+            status, _ = await server.dispatch("DELETE", f"/matches/{match['id']}", b"")
+            self.assertEqual(status, HTTPStatus.OK)
+            status, _ = await server.dispatch("GET", f"/matches/{match['id']}", b"")
+            self.assertEqual(status, HTTPStatus.NOT_FOUND)
+
+        asyncio.run(play())
+
+    def test_lookup_failure_answers_service_unavailable(self):
+        server = self.server()
+
+        async def play():
+            status, match = await server.dispatch("POST", "/matches", b'{"players": ["Ann", "Bob"]}')
+            self.assertEqual(status, HTTPStatus.CREATED)
+            moves = f"/matches/{match['id']}/moves"
+            status, _ = await server.dispatch("POST", moves, json.dumps({"artist": "Artist 1"}).encode())
+            self.assertEqual(status, HTTPStatus.OK)
+            self.engine.fetch_artist_data("Artist 3")
+            self.stub.rate_429 = 1.0
+            status, _ = await server.dispatch("POST", moves, json.dumps({"artist": "Artist 3"}).encode())
+            self.assertEqual(status, HTTPStatus.SERVICE_UNAVAILABLE)
+            status, match = await server.dispatch("GET", f"/matches/{match['id']}", b"")
+            self.assertEqual((match["moves"], match["scores"]), (1, {"1": 0, "2": 0}))
+
+        asyncio.run(play())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import genius_api
+from bench import page_decode
+from instrumentation import recorder
+from tests.support import StubTestCase
+
+PER_PAGE = 50
+
+
+class FetchArtistSongsTest(StubTestCase):
+    # Artist 1 has three pages of songs, artist 9 a single short one
+    SONGS = [(song_id, [1, 2] if song_id % 10 == 0 else [1]) for song_id in range(1, 121)]
+    SONGS += [(song_id, [9, 1]) for song_id in range(200, 209)]
+
+    def test_one_page_discography_costs_one_request(self):
+        songs, stats = genius_api.fetch_artist_songs(9, "token")
+        self.assertEqual([song.id for song in songs], list(range(200, 209)))
+        self.assertEqual(self.stub.counters["songs"], 1)
+        self.assertEqual(stats.pages, 1)
+        self.assertTrue(stats.complete)
+
+    def test_pages_are_joined_in_order(self):
+        songs, stats = genius_api.fetch_artist_songs(1, "token")
+        self.assertEqual([song.id for song in songs], list(range(1, 121)) + list(range(200, 209)))
+        self.assertEqual(stats.pages, 3)
+        self.assertTrue(stats.complete)
+
+    def test_failed_page_keeps_only_the_pages_before_it(self):
+        fetch_page = genius_api.fetch_songs_page
+
+        def fail_page_two(artist_id, page, *args, **kwargs):
+            return None if page == 2 else fetch_page(artist_id, page, *args, **kwargs)
+
+        with mock.patch.object(genius_api, "fetch_songs_page", fail_page_two):
+            songs, stats = genius_api.fetch_artist_songs(1, "token")
+        self.assertEqual([song.id for song in songs], list(range(1, PER_PAGE + 1)))
+        self.assertTrue(stats.failed)
+        self.assertFalse(stats.complete)
+
+    def test_spent_budget_keeps_contiguous_pages(self):
+        songs, stats = genius_api.fetch_artist_songs(1, "token", budget=genius_api.RequestBudget(2))
+        self.assertEqual([song.id for song in songs], list(range(1, 2 * PER_PAGE + 1)))
+        self.assertTrue(stats.cancelled)
+        self.assertFalse(stats.complete)
+
+    def test_throttled_pages_fail_the_crawl(self):
+        self.stub.rate_429 = 1.0
+        with mock.patch("builtins.print"):
+            songs, stats = genius_api.fetch_artist_songs(1, "token")
+        self.assertEqual(songs, [])
+        self.assertTrue(stats.failed)
+        self.assertEqual(self.stub.counters["429"], genius_api.MAX_RETRIES + 1)
+
+    def test_counts_bytes_received_not_decompressed(self):
+        before = recorder.totals["bytes_downloaded"]
+        genius_api.fetch_artist_songs(9, "token")
+        self.assertEqual(recorder.totals["bytes_downloaded"] - before, self.stub.counters["bytes"])
+
+
+class SongStreamTest(StubTestCase):
+    # Three pages; artist 2 features on the first
+    SONGS = [(song_id, [1, 2] if song_id == 1 else [1]) for song_id in range(1, 121)]
+
+    def test_pages_can_be_read_while_the_crawl_runs(self):
+        finished = []
+        stream = genius_api.SongStream(1, "token", on_complete=lambda songs, stats: finished.append(songs)).start()
+        first_page = next(iter(stream))
+        self.assertIn(genius_api.Song(1, ((1, "Artist 1"), (2, "Artist 2"))), first_page)
+
+        stats = stream.wait()
+        self.assertTrue(stats.complete)
+        self.assertEqual(len(finished), 1)
+        self.assertEqual([song.id for song in finished[0]], list(range(1, 121)))
+        # A finished stream can still be read from the start
+        self.assertEqual(sum(len(songs) for songs in stream), 120)
+
+
+class CoalescingTest(StubTestCase):
+    SONGS = [(1, [1, 2])]
+
+    def test_concurrent_crawls_of_an_artist_share_one(self):
+        self.stub.latency = 0.2
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            crawls = [executor.submit(genius_api.fetch_artist_songs, 1, "token") for _ in range(4)]
+        self.assertEqual({len(crawl.result()[0]) for crawl in crawls}, {1})
+        self.assertEqual(self.stub.counters["songs"], 1)
+
+    def test_budgeted_crawls_are_not_shared(self):
+        for _ in range(2):
+            genius_api.fetch_artist_songs(1, "token", budget=genius_api.RequestBudget(5))
+        self.assertEqual(self.stub.counters["songs"], 2)
+
+
+class FetchNewSongsTest(StubTestCase):
+    # Newest release first: 12, 9 | 8, 11 | 7, 6 | 5. Song 11 was added after the
+    # last crawl (high-water mark 10) but dated before songs already seen.
+    SONGS = [
+        (12, [1], "2024-03-01"),
+        (9, [1], "2024-02-01"),
+        (8, [1, 2], "2024-01-01"),
+        (11, [1, 3], "2023-06-01"),
+        (7, [1], "2023-01-01"),
+        (6, [1], "2022-01-01"),
+        (5, [1], "2021-01-01"),
+    ]
+
+    def test_walks_until_a_page_has_no_new_songs(self):
+        songs, stats = genius_api.fetch_new_songs(1, "token", newest_song_id=10, per_page=2)
+        self.assertEqual(sorted(song.id for song in songs), [11, 12])
+        self.assertEqual(self.stub.counters["songs"], 3)
+        self.assertTrue(stats.complete)
+
+    def test_nothing_new_costs_one_request(self):
+        songs, stats = genius_api.fetch_new_songs(1, "token", newest_song_id=12, per_page=2)
+        self.assertEqual(songs, [])
+        self.assertEqual(self.stub.counters["songs"], 1)
+
+    def test_failure_is_reported(self):
+        self.stub.rate_429 = 1.0
+        with mock.patch("builtins.print"):
+            songs, stats = genius_api.fetch_new_songs(1, "token", newest_song_id=10, per_page=2)
+        self.assertEqual(songs, [])
+        self.assertTrue(stats.failed)
+
+
+class DecodeSongsPageTest(unittest.TestCase):
+    def page(self, songs, next_page=None):
+        return json.dumps({"meta": {"status": 200}, "response": {"songs": songs, "next_page": next_page}}).encode()
+
+    def test_keeps_ids_and_names_primary_first(self):
+        songs, next_page = genius_api.decode_songs_page(self.page([{
+            "id": 7,
+            "title": "Song",
+            "primary_artist": {"id": 1, "name": "One", "url": "https://genius.com/artists/One"},
+            "featured_artists": [{"id": 2, "name": "Two"}, {"id": 1, "name": "One"}],
+        }], next_page=2))
+        self.assertEqual(songs, [genius_api.Song(7, ((1, "One"), (2, "Two")))])
+        self.assertEqual(next_page, 2)
+
+    def test_matches_decoding_the_full_page(self):
+        body = page_decode.make_pages(1, PER_PAGE, 20, seed=1)[0]
+        self.assertEqual(genius_api.decode_songs_page(body), page_decode.decode_json_songs(body))
+
+    def test_skips_malformed_songs(self):
+        with mock.patch("builtins.print"):
+            songs, next_page = genius_api.decode_songs_page(self.page([
+                {"id": 1, "primary_artist": {"id": 1, "name": "One"}, "featured_artists": None},
+                {"id": 2, "featured_artists": []},
+                {"id": 3, "primary_artist": {"name": "Three"}},
+            ]))
+        self.assertEqual(songs, [genius_api.Song(1, ((1, "One"),))])
+        self.assertIsNone(next_page)
+
+    def test_rejects_other_bodies(self):
+        self.assertIsNone(genius_api.decode_songs_page(b"<html>"))
+        self.assertIsNone(genius_api.decode_songs_page(b'{"meta": {"status": 200}, "response": {"hits": []}}'))
+
+
+if __name__ == "__main__":
+    unittest.main()
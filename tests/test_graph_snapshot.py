@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from graph_snapshot import GraphSnapshot, write_snapshot
+
+
+class GraphSnapshotTest(unittest.TestCase):
+    ARTISTS = {
+        5: "Jay-Z",
+        7: "Kanye West",
+        9: "MØ",
+        12: "Моргенштерн",
+        40: "Loner",
+        41: "JAY Z",  # Same alias as 5, fewer collaborators
+    }
+    EDGES = [(5, 7), (7, 5), (7, 9), (12, 7), (9, 9), (5, 99)]
+
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory(prefix="rapbattle-test-")
+        self.addCleanup(workdir.cleanup)
+        path = os.path.join(workdir.name, "graph.snapshot")
+        write_snapshot(path, self.ARTISTS, self.EDGES)
+        self.snapshot = GraphSnapshot(path)
+        self.addCleanup(self.snapshot.close)
+
+    def test_round_trip(self):
+        self.assertEqual(self.snapshot.artist_ids(), sorted(self.ARTISTS))
+        self.assertEqual(self.snapshot.neighbors(7), [5, 9, 12])
+        self.assertEqual(self.snapshot.neighbors(5), [7])  # Unknown artists are dropped
+        self.assertEqual(self.snapshot.neighbors(9), [7])  # As are self-edges
+        self.assertEqual(self.snapshot.neighbors(40), [])
+        self.assertEqual(self.snapshot.neighbors(1000), [])
+        for artist_id, name in self.ARTISTS.items():
+            self.assertEqual(self.snapshot.name(artist_id), name)
+        self.assertIsNone(self.snapshot.name(1000))
+
+    def test_has_edge(self):
+        self.assertTrue(self.snapshot.has_edge(12, 7))
+        self.assertTrue(self.snapshot.has_edge(7, 12))
+        self.assertFalse(self.snapshot.has_edge(5, 9))
+        self.assertFalse(self.snapshot.has_edge(5, 99))
+
+    def test_find_artist(self):
+        self.assertEqual(self.snapshot.find_artist("kanye  west"), {"id": 7, "name": "Kanye West", "image_url": None})
+        self.assertEqual(self.snapshot.find_artist("jay z")["id"], 5)
+        self.assertEqual(self.snapshot.find_artist("mø")["id"], 9)
+        self.assertEqual(self.snapshot.find_artist("МОРГЕНШТЕРН")["id"], 12)
+        self.assertIsNone(self.snapshot.find_artist("m"))
+        self.assertIsNone(self.snapshot.find_artist("Nobody"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import pstats
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from instrumentation import Recorder, SessionProfiler
+
+
+class RecorderTest(unittest.TestCase):
+    def test_spans_and_counters_go_to_the_open_turn(self):
+        recorder = Recorder(trace_file=None)
+        recorder.count("api_calls")  # No turn open yet: only the session total
+        first = recorder.begin_turn("Artist 1")
+        with recorder.span("api.search", artist_id=1):
+            pass
+        recorder.count("api_calls", 2)
+        thread = threading.Thread(target=recorder.add_span, args=("songs.crawl", 0.0, 0.5), name="crawl")
+        thread.start()
+        thread.join()
+        second = recorder.begin_turn("Artist 2")
+
+        self.assertEqual(first.counters, {"api_calls": 2})
+        self.assertEqual(recorder.totals, {"api_calls": 3})
+        self.assertEqual([(span["name"], span["thread"]) for span in first.spans],
+                         [("api.search", "MainThread"), ("songs.crawl", "crawl")])
+        self.assertEqual(first.spans[0]["artist_id"], 1)
+        self.assertEqual(first.breakdown()[0], ("songs.crawl", 500.0))
+        self.assertEqual(list(recorder.history), [first])
+        self.assertIs(recorder.current, second)
+        self.assertIn("Turn 1: Artist 1", recorder.summary(first))
+
+    def test_history_is_bounded_and_exported(self):
+        with tempfile.TemporaryDirectory(prefix="rapbattle-test-") as workdir:
+            trace_file = os.path.join(workdir, "turns.jsonl")
+            recorder = Recorder(trace_file=trace_file, history_size=3)
+            for label in "abcde":
+                recorder.begin_turn(label)
+            recorder.close()
+            self.assertEqual([turn.label for turn in recorder.history], ["c", "d", "e"])
+            self.assertIsNone(recorder.current)
+            with open(trace_file, encoding="utf-8") as f:
+                self.assertEqual([json.loads(line)["label"] for line in f], list("abcde"))
+
+
+def crawl_in_background():
+    return sum(range(1000))
+
+
+class SessionProfilerTest(unittest.TestCase):
+    def test_writes_profile_and_memory_report(self):
+        with tempfile.TemporaryDirectory(prefix="rapbattle-test-") as workdir:
+            prefix = os.path.join(workdir, "session")
+            profiler = SessionProfiler(prefix)
+            profiler.start()
+
+            def work():
+                with profiler.profiled():
+                    crawl_in_background()
+
+            def idle():
+                with profiler.profiled():
+                    pass
+
+            # A thread whose profile recorded nothing mustn't break the merge
+            threads = [threading.Thread(target=work), threading.Thread(target=idle)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with mock.patch("builtins.print"):
+                profiler.stop()
+
+            functions = {name for _, _, name in pstats.Stats(f"{prefix}.prof").stats}
+            self.assertIn("crawl_in_background", functions)
+            with open(f"{prefix}.memory.txt", encoding="utf-8") as f:
+                self.assertTrue(f.readline().startswith("current "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from unittest import mock
+
+import name_index
+from name_index import NameIndex
+
+
+def loaded(names, weights=None, aliases=()):
+    index = NameIndex()
+    index._build(dict(names), dict(weights or {}), aliases)
+    index._loaded.set()
+    return index
+
+
+class SuggestTest(unittest.TestCase):
+    NAMES = {1: "Lil Wayne", 2: "Lil Baby", 3: "Lil", 4: "Lizzo", 5: "Jay-Z", 6: "MØ"}
+    WEIGHTS = {1: 50, 2: 80, 3: 1, 4: 10, 5: 90, 6: 5}
+
+    def test_exact_match_first_then_best_known(self):
+        index = loaded(self.NAMES, self.WEIGHTS)
+        self.assertEqual(index.suggest("lil"), [("Lil", 3), ("Lil Baby", 2), ("Lil Wayne", 1)])
+        self.assertEqual(index.suggest("Li", limit=2), [("Lil Baby", 2), ("Lil Wayne", 1)])
+        self.assertEqual(index.suggest("jay z"), [("Jay-Z", 5)])
+        self.assertEqual(index.suggest("mø"), [("MØ", 6)])
+        self.assertEqual(index.suggest("x"), [])
+
+    def test_aliases_find_the_canonical_name(self):
+        index = loaded(self.NAMES, self.WEIGHTS, aliases=[("weezy", 1), ("nobody", 99)])
+        self.assertEqual(index.suggest("wee"), [("Lil Wayne", 1)])
+        self.assertEqual(index.suggest("nob"), [])
+
+    def test_nothing_before_loading(self):
+        self.assertEqual(NameIndex().suggest("lil"), [])
+
+
+class AddTest(unittest.TestCase):
+    def test_added_names_are_suggested(self):
+        index = loaded(SuggestTest.NAMES, SuggestTest.WEIGHTS)
+        index.add({7: "Lil Nas X"}, aliases=[("montero", 7)], songs={7: 100, 3: 1})
+        self.assertEqual(index.suggest("lil")[:2], [("Lil", 3), ("Lil Nas X", 7)])
+        self.assertEqual(index.suggest("mont"), [("Lil Nas X", 7)])
+        index.add({7: "Lil Nas X"})
+        self.assertEqual(index.keys.count("lilnasx"), 1)
+        self.assertEqual(index.keys, sorted(index.keys))
+
+    def test_adds_during_loading_are_replayed(self):
+        index = NameIndex()
+        index.add({7: "Lil Nas X"}, songs={7: 3})
+        index._build({1: "Lil Wayne"}, {1: 5}, [])
+        index._loaded.set()
+        self.assertEqual(index.suggest("lil"), [("Lil Wayne", 1), ("Lil Nas X", 7)])
+
+    def test_merges_without_blocking_suggestions(self):
+        index = loaded({artist_id: f"Artist {artist_id}" for artist_id in range(1000)})
+        merged = name_index._merged
+
+        def unlocked_merge(*args):
+            self.assertFalse(index._lock.locked())
+            return merged(*args)
+
+        with mock.patch.object(name_index, "_merged", unlocked_merge):
+            index.add({artist_id: f"Artist {artist_id}" for artist_id in range(1000, 1300)})
+        self.assertEqual(len(index.keys), 1300)
+        self.assertEqual(index.keys, sorted(index.keys))
+        self.assertEqual(index.suggest("artist 1299"), [("Artist 1299", 1299)])
+
+    def test_well_credited_newcomers_reach_short_prefixes(self):
+        names = {artist_id: f"Lil {artist_id}" for artist_id in range(100)}
+        weights = {artist_id: artist_id for artist_id in range(100)}
+        with mock.patch.object(name_index, "POPULAR_NAMES", 10), mock.patch.object(name_index, "SCAN_LIMIT", 20):
+            index = loaded(names, weights)
+            index.add({500: "Lil Newcomer"}, songs={500: 200})
+            index.add({501: "Lil Unknown"}, songs={501: 1})
+            index.add({}, songs={50: 100})  # An artist already indexed becomes popular
+            suggestions = [artist_id for _, artist_id in index.suggest("l", limit=3)]
+        self.assertEqual(suggestions, [500, 50, 99])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+
+import engine
+from prefetch import Prefetcher
+from tests.support import EngineTestCase
+
+
+class PrefetcherTest(EngineTestCase):
+    # Artist 1 features artist 2 twice and artists 3-9 once; each has a song of their own
+    SONGS = [(1, [1, 2]), (2, [2, 1])] + [(n, [1, n]) for n in range(3, 10)] + [(100 + n, [n]) for n in range(2, 10)]
+
+    def prefetcher(self, **kwargs):
+        return Prefetcher(self.engine.fetch_artist_data, self.engine.fetch_collaborations, self.engine.top_collaborators, **kwargs)
+
+    def requests(self):
+        return self.stub.counters["search"] + self.stub.counters["songs"]
+
+    def test_stops_when_the_budget_is_spent(self):
+        prefetcher = self.prefetcher(max_artists=5, max_requests=4)
+        prefetcher.start(1)
+        prefetcher.wait()
+        # Artist 1's songs, then a search and the songs of artist 2, then a search for the next
+        self.assertEqual(self.requests(), 4)
+        self.assertIsNotNone(self.engine.db.get_collaborators(2))
+
+    def test_cancel_stops_before_the_next_request(self):
+        self.stub.latency = 0.2
+        prefetcher = self.prefetcher()
+        prefetcher.start(1)
+        prefetcher.cancel()
+        prefetcher.wait()
+        self.assertLessEqual(self.requests(), 1)
+
+    def test_stale_cache_hits_are_not_refreshed(self):
+        for artist_id in (1, 2):
+            self.engine.fetch_collaborations(artist_id)
+        self.engine.fetch_artist_data("Artist 2")
+        self.stub.reset_counters()
+        with mock.patch.object(engine, "COLLABORATIONS_TTL", -1):
+            prefetcher = self.prefetcher(max_artists=1)
+            prefetcher.start(1)
+            prefetcher.wait()
+        self.assertEqual(self.engine.refreshes, {})
+        self.assertEqual(self.requests(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Background worker layer that keeps network and database work off the GUI thread."""
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from instrumentation import profiled
+
+# Workers get their own pool rather than QThreadPool.globalInstance(): Qt's smooth
+# image scaling borrows global pool threads while the GUI thread holds the GIL,
+# so sharing it with Python workers can deadlock.
+_thread_pool = QThreadPool()
+_thread_pool.setMaxThreadCount(4)
+
+# Workers that are still running. Holding a reference here keeps their signals
+# alive until the result has been delivered back to the GUI thread.
+_active_workers = set()
+
+
+class WorkerSignals(QObject):
+    """Signals a Worker uses to report back to the GUI thread."""
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Run a blocking callable on the worker thread pool."""
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            with profiled():
+                result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+def run_in_background(fn, *args, on_result=None, on_error=None, **kwargs):
+    """Run fn(*args, **kwargs) off the GUI thread.
+
+    on_result / on_error are called on the GUI thread once the call completes.
+    Must be called from the GUI thread so the callbacks are delivered there.
+    """
+    worker = Worker(fn, *args, **kwargs)
+    if on_result is not None:
+        worker.signals.result.connect(on_result)
+    if on_error is not None:
+        worker.signals.error.connect(on_error)
+    else:
+        worker.signals.error.connect(lambda e: print(f"Background task failed: {e!r}"))
+    worker.signals.finished.connect(lambda: _active_workers.discard(worker))
+    _active_workers.add(worker)
+    _thread_pool.start(worker)
+    return worker